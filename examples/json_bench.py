@@ -0,0 +1,42 @@
+'''
+Compare the speed of yajl-py against the json module of the standard library
+'''
+
+import os
+import sys
+import json
+import timeit
+BASEPATH = os.path.dirname(os.path.realpath(__file__))
+sys.path = [BASEPATH, '%s/..' %BASEPATH] + sys.path
+import yajl
+from yajl import __version__ as yajl_version
+from yajl.bench import corpus
+
+import optparse
+
+def bench(name, func, size, repeat):
+    best = min(timeit.repeat(func, number=1, repeat=repeat))
+    print('%-12s %8.3fs %8.2f MB/s' %(name, best, size / best / 2**20))
+
+def main():
+    opt_parser = optparse.OptionParser(
+        description='benchmark yajl-py against the json module',
+        version='Yajl-Py for Yajl %s' %yajl_version)
+    opt_parser.add_option("-s",
+        dest="size", type="float", default=10,
+        help="size in MB of the generated document of records")
+    opt_parser.add_option("-r",
+        dest="repeat", type="int", default=3,
+        help="number of times to repeat each benchmark")
+    (options, args) = opt_parser.parse_args()
+    # the records corpus of yajl.bench
+    doc = corpus('records', int(options.size * 2**20))
+    print('document size: %.2f MB' %(len(doc) / 2.0**20))
+    bench('json.loads', lambda: json.loads(doc), len(doc), options.repeat)
+    bench('yajl.loads', lambda: yajl.loads(doc), len(doc), options.repeat)
+    obj = json.loads(doc)
+    bench('json.dumps', lambda: json.dumps(obj), len(doc), options.repeat)
+    bench('yajl.dumps', lambda: yajl.dumps(obj), len(doc), options.repeat)
+
+if __name__ == "__main__":
+    main()
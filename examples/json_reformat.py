@@ -7,86 +7,11 @@ import sys
 BASEPATH = os.path.dirname(os.path.realpath(__file__))
 sys.path = [BASEPATH, '%s/..' % BASEPATH] + sys.path
 from yajl import __version__ as yajl_version
-from yajl import (
-    __version__ as yajl_version,
-    YajlContentHandler, YajlGen, YajlParser,
-    YajlGenException,
-)
+from yajl import reformat
 
 import optparse
 
 
-class ReformatContentHandler(YajlContentHandler):
-    '''
-    Content handler to reformat a json file using yajl_gen
-    '''
-    def __init__(self, beautify=True, indent_string=b"  ", stream=False):
-        self.out = sys.stdout
-        self.beautify = beautify
-        self.indent_string = indent_string
-        self.stream = stream
-    def parse_start(self):
-        self.g = YajlGen(
-            beautify=self.beautify,
-            indent_string=self.indent_string,
-        )
-    def parse_buf(self):
-        self.out.write(self.g.yajl_gen_get_buf().decode('utf-8'))
-    def parse_complete(self):
-        if not stream:
-            # not necessary, gc will do this @ python shutdown
-            del self.g
-    def check_and_return(self, func, *args, **kwargs):
-        try:
-            func(*args, **kwargs)
-        except YajlGenException as e:
-            if self.stream and e.value == 'yajl_gen_generation_complete':
-                self.g.yajl_gen_reset(b'\n')
-                func(*args, **kwargs)
-            else:
-                raise
-    def yajl_null(self, ctx):
-        self.check_and_return(
-            self.g.yajl_gen_null,
-        )
-    def yajl_boolean(self, ctx, boolVal):
-        self.check_and_return(
-            self.g.yajl_gen_bool,
-            boolVal
-        )
-    def yajl_number(self, ctx, stringNum):
-        self.check_and_return(
-            self.g.yajl_gen_number,
-            stringNum
-        )
-    def yajl_string(self, ctx, stringVal):
-        self.check_and_return(
-            self.g.yajl_gen_string,
-            stringVal
-        )
-    def yajl_start_map(self, ctx):
-        self.check_and_return(
-            self.g.yajl_gen_map_open,
-        )
-    def yajl_map_key(self, ctx, stringVal):
-        self.check_and_return(
-            self.g.yajl_gen_string,
-            stringVal
-        )
-    def yajl_end_map(self, ctx):
-        self.check_and_return(
-            self.g.yajl_gen_map_close,
-        )
-    def yajl_start_array(self, ctx):
-        self.check_and_return(
-            self.g.yajl_gen_array_open,
-        )
-    def yajl_end_array(self, ctx):
-        self.check_and_return(
-            self.g.yajl_gen_array_close,
-        )
-
-
 def main():
     opt_parser = optparse.OptionParser(
         description='reformat json from stdin',
@@ -104,18 +29,17 @@ def main():
         dest="stream", action='store_true', default=False,
         help="reformat a stream of multiple json entites")
     (options, args) = opt_parser.parse_args()
-    # initialize the content handler (creates a Yajl Gen)
-    ch = ReformatContentHandler(
+    # the parser callbacks feed a yajl_gen directly, without a content
+    # handler, the output is written after each buffer parsed
+    reformat(
+        sys.stdin, getattr(sys.stdout, 'buffer', sys.stdout),
         beautify=options.beautify,
+        indent=b'  ',
         stream=options.stream,
+        escape_solidus=options.escape_solidus,
+        allow_comments=True,  # let's allow comments by default
+        dont_validate_strings=options.dont_validate_strings,
     )
-    # initialize the parser
-    yajl_parser = YajlParser(ch)
-    yajl_parser.allow_comments = True  # let's allow comments by default
-    yajl_parser.allow_multiple_values = True
-    yajl_parser.dont_validate_strings = options.dont_validate_strings
-    yajl_parser.allow_multiple_values = options.stream
-    yajl_parser.parse()
 
 if __name__ == "__main__":
     main()
@@ -14,7 +14,8 @@ import optparse
 
 def main():
     opt_parser = optparse.OptionParser(
-        description='validate json from stdin',
+        usage='%prog [options] [file ...]',
+        description='validate json from stdin, or from the given files',
         version='Yajl-Py for Yajl %s' %yajl_version)
     opt_parser.add_option("-q",
         action="store_false", dest="verbose", default=True,
@@ -25,7 +26,22 @@ def main():
     opt_parser.add_option("-u",
         dest="dont_validate_strings", action='store_true', default=False,
         help="allow invalid utf8 inside strings")
+    opt_parser.add_option("-j",
+        dest="workers", type="int", default=None,
+        help="number of files to validate in parallel (default: cpu count)")
     (options, args) = opt_parser.parse_args()
+    if args:
+        retval = 0
+        for result in validate_many(args, options.workers,
+                allow_comments=options.allow_comments,
+                dont_validate_strings=options.dont_validate_strings):
+            if not result.valid:
+                retval = 1
+            if options.verbose:
+                six.print_("%s: JSON is %s" %(result.source,
+                    "valid" if result.valid else "invalid at byte %s: %s" %(
+                        result.offset, result.error)))
+        raise SystemExit(retval)
     yajl_parser = YajlParser()
     yajl_parser.allow_comments = options.allow_comments
     yajl_parser.dont_validate_strings = options.dont_validate_strings
@@ -0,0 +1,70 @@
+import asyncio
+import unittest
+import mock
+import yajl
+from test_yajl import BaseContentHandler
+
+class AsyncYajlParserTests(unittest.TestCase):
+    '''
+    Testing :class:`AsyncYajlParser`
+    '''
+    doc = b'{"a": [null, true, 1, 1.2, "Test Line: a"]}'
+
+    def run_async(self, coro):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro)
+        finally:
+            loop.close()
+
+    def stream_reader(self):
+        reader = asyncio.StreamReader()
+        reader.feed_data(self.doc)
+        reader.feed_eof()
+        return reader
+
+    def test_parse_streamReader(self):
+        content_handler = BaseContentHandler()
+        with mock.patch.multiple(content_handler,
+            yajl_string=mock.DEFAULT,
+            complete_parse=mock.DEFAULT,
+        ):
+            parser = yajl.AsyncYajlParser(content_handler, buf_siz=4)
+            async def parse():
+                await parser.parse(self.stream_reader())
+            self.run_async(parse())
+            content_handler.yajl_string.assert_called_with(
+                None, b'Test Line: a')
+            self.assertTrue(content_handler.complete_parse.called)
+
+    def test_parse_raisesExceptionOnInvalidJson(self):
+        parser = yajl.AsyncYajlParser()
+        async def chunks():
+            yield b'{"a": '
+            yield b'}'
+        self.assertRaises(
+            yajl.YajlError, self.run_async, parser.parse(chunks()))
+
+    def test_parse_asyncIterableOfBytearray(self):
+        content_handler = BaseContentHandler()
+        with mock.patch.object(content_handler, 'yajl_string'):
+            parser = yajl.AsyncYajlParser(content_handler)
+            async def chunks():
+                for i in range(0, len(self.doc), 5):
+                    yield bytearray(self.doc[i:i + 5])
+            self.run_async(parser.parse(chunks()))
+            content_handler.yajl_string.assert_called_with(
+                None, b'Test Line: a')
+
+    def test_events_asyncIterable(self):
+        parser = yajl.AsyncYajlParser(batch_events=True)
+        async def chunks():
+            for i in range(0, len(self.doc), 5):
+                yield self.doc[i:i + 5]
+        async def events():
+            return [e async for e, v in parser.events(chunks())]
+        self.assertEqual([
+            'start_map', 'map_key', 'start_array', 'null', 'boolean',
+            'integer', 'double', 'string', 'end_array', 'end_map',
+        ], [yajl.yajl_parse.yajl_event_names[e]
+            for e in self.run_async(events())])
@@ -54,7 +54,7 @@ class YajlCTests(unittest.TestCase):
         self.out.seek(0)
         self.out.truncate()
 
-def _make_test(filename, testname):
+def _make_test(filename, testname, mmap=False):
     def test(self):
         config_key = None
         config = lambda yp: setattr(yp, config_key, True)
@@ -71,11 +71,14 @@ def _make_test(filename, testname):
             parser = yajl.YajlParser(self.content_handler, buf_siz=buf_siz)
             if config_key:
                 config(parser)
-            with open(filename, 'rb') as f:
-                try:
-                    parser.parse(f)
-                except yajl.YajlError as e:
-                    self.out.write(six.b('%s\n' % e.value.splitlines()[0]))
+            try:
+                if mmap:
+                    parser.parse_file(filename, mmap=True)
+                else:
+                    with open(filename, 'rb') as f:
+                        parser.parse(f)
+            except yajl.YajlError as e:
+                self.out.write(six.b('%s\n' % e.value.splitlines()[0]))
             self.assertSameAsGold(filename)
             self.resetOutput()
     return test
@@ -88,5 +91,7 @@ def _add_methods():
         name = filename[:-5]
         test = _make_test(fullname, name)
         setattr(YajlCTests, 'test_%s' %name, test)
+        test = _make_test(fullname, name, mmap=True)
+        setattr(YajlCTests, 'test_mmap_%s' %name, test)
 
 _add_methods()
@@ -13,20 +13,39 @@ Pure Python wrapper to the Yajl C library
 import sys
 
 from .yajl_common import (
-    YajlException, YajlConfigError, YajlError, get_yajl_version,
+    YajlException, YajlConfigError, YajlError, YajlStats, get_yajl_version,
 )
 from .yajl_parse import (
-    YajlParseCancelled, YajlContentHandler, YajlParser,
+    YajlParseCancelled, YajlContentHandler, YajlParser, YajlEventBatch,
+    YajlCheckpoint, load, loads,
+)
+from .yajl_items import (
+    basic_events, prefix_events, items, columns,
+)
+from .yajl_validate import (
+    YajlValidation, validate, validate_many,
 )
 from .yajl_gen import (
-    YajlGenException, YajlGen,
+    YajlGenException, YajlGen, dump, dumps,
 )
+from .yajl_reformat import reformat
+from .pool import YajlPool
+from . import parallel, index
+from .index import YajlIndex
 
 __all__ = [
-    'YajlException', 'YajlConfigError', 'YajlError',
+    'YajlException', 'YajlConfigError', 'YajlError', 'YajlStats',
     'YajlParseCancelled', 'YajlGenException',
-    'YajlContentHandler', 'YajlParser', 'YajlGen',
+    'YajlContentHandler', 'YajlParser', 'YajlEventBatch', 'YajlCheckpoint',
+    'YajlGen',
+    'load', 'loads', 'dump', 'dumps', 'basic_events', 'prefix_events',
+    'items', 'columns', 'reformat',
+    'YajlValidation', 'validate', 'validate_many', 'YajlPool',
+    'YajlIndex',
 ]
+if sys.version_info >= (3, 6):
+    from .yajl_async import AsyncYajlParser
+    __all__.append('AsyncYajlParser')
 __version__ = '2.1.2'
 yajl_version = get_yajl_version()
 
@@ -50,16 +69,3 @@ def check_yajl_version():
     return True
 
 check_yajl_version()
-
-# monkey patch yajl, because anyjson devs are slacking off,
-# and I got an issue request that I would like to help out.
-# see https://bitbucket.org/runeh/anyjson/pull-requests/5/
-class Wrapper(object):
-  def __init__(self, wrapped):
-    self.wrapped = wrapped
-  def __getattr__(self, name):
-    if name in ('dumps', 'loads'):
-        raise ImportError('this is not py-yajl ... anyjson!')
-    return getattr(self.wrapped, name)
-
-sys.modules[__name__] = Wrapper(sys.modules[__name__])
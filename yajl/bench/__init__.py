@@ -0,0 +1,238 @@
+'''
+Throughput benchmarks of yajl-py over synthetic corpora, run with::
+
+    python -m yajl.bench -o results.json
+
+Each corpus is generated locally at the requested size, and parsed with
+:class:`YajlParser` and a content handler counting the events, parsed into
+python objects with :func:`yajl.load`, and generated back with
+:func:`yajl.dumps`, for each of the ``buf_siz`` values. The results hold
+the throughput in MB/s of input (or output) JSON, the events per second,
+and the peak memory allocated by each benchmark, measured in a separate run
+traced with :mod:`tracemalloc`.
+'''
+
+import gc
+import io
+import json
+import platform
+import time
+import timeit
+from .. import YajlContentHandler, YajlParser, load, loads, dumps
+from .. import __version__, yajl_version
+
+try:
+    import tracemalloc
+except ImportError: # python 2
+    tracemalloc = None
+
+def _wide(n):
+    ''' one object with n keys '''
+    return {'key%d' %i: i for i in range(n)}
+
+def _deep(n):
+    ''' n levels of nested arrays and objects '''
+    doc = value = {}
+    for i in range(n):
+        child = {} if i % 2 else []
+        if value.__class__ is dict:
+            value['level%d' %i] = child
+        else:
+            value.append(child)
+        value = child
+    return doc
+
+def _records(n):
+    return [
+        {
+            'id': i,
+            'name': 'record %d' %i,
+            'score': i * 0.5,
+            'active': bool(i % 2),
+            'tags': ['a', 'b', 'c'],
+            'parent': None,
+        }
+        for i in range(n)
+    ]
+
+def _strings(n):
+    return ['string %d with some "escaped"\ttext é' %i for i in range(n)]
+
+def _numbers(n):
+    return [[i, i * 1.5, -i * 1e10] for i in range(n)]
+
+def _repeat(make, size):
+    '''
+    :returns: the JSON text of the document built by ``make(n)``, with n
+        grown until the text is at least ``size`` bytes long
+    '''
+    n = 16
+    while 1:
+        doc = json.dumps(make(n)).encode('utf-8')
+        if len(doc) >= size:
+            return doc
+        n = max(n * 2, int(n * size / max(len(doc), 1)) + 1)
+
+def _ndjson(size):
+    line = json.dumps(_records(1)[0]).encode('utf-8')
+    return b'\n'.join([line] * (size // (len(line) + 1) + 1))
+
+def _deep_doc(size):
+    # yajl_gen is limited to 128 levels, concatenate nested documents
+    doc = json.dumps(_deep(100)).encode('utf-8')
+    return b'[' + b','.join([doc] * (size // len(doc) + 1)) + b']'
+
+# functions generating each corpus at a given size, by name
+_corpora = {
+    'deep': _deep_doc,
+    'wide': lambda size: _repeat(_wide, size),
+    'records': lambda size: _repeat(_records, size),
+    'strings': lambda size: _repeat(_strings, size),
+    'numbers': lambda size: _repeat(_numbers, size),
+    'ndjson': _ndjson,
+}
+corpus_names = sorted(_corpora)
+
+def _generator(name):
+    '''
+    :returns: the function generating the corpus ``name``
+    :raises ValueError: When there is no corpus ``name``
+    '''
+    try:
+        return _corpora[name]
+    except KeyError:
+        raise ValueError('unknown corpus %r, expected one of %s' %(
+            name, ', '.join(corpus_names)))
+
+def corpus(name, size):
+    '''
+    :type name: string
+    :param name: name of the corpus, one of :data:`corpus_names`
+    :type size: int
+    :param size: minimum size in bytes of the corpus
+    :returns: the JSON text of the corpus
+    :raises ValueError: When there is no corpus ``name``
+    '''
+    return _generator(name)(size)
+
+def corpora(size, names=corpus_names):
+    '''
+    :type size: int
+    :param size: minimum size in bytes of each corpus
+    :param names: names of the corpora to generate, all by default
+    :returns: dict of the name of each corpus to its JSON text
+    '''
+    return dict((name, corpus(name, size)) for name in names)
+
+class CountingContentHandler(YajlContentHandler):
+    ''' content handler doing nothing but counting the events '''
+    def __init__(self):
+        self.events = 0
+    def yajl_null(self, ctx):
+        self.events += 1
+    def yajl_boolean(self, ctx, boolVal):
+        self.events += 1
+    def yajl_integer(self, ctx, integerVal):
+        self.events += 1
+    def yajl_double(self, ctx, doubleVal):
+        self.events += 1
+    def yajl_string(self, ctx, stringVal):
+        self.events += 1
+    def yajl_start_map(self, ctx):
+        self.events += 1
+    def yajl_map_key(self, ctx, stringVal):
+        self.events += 1
+    def yajl_end_map(self, ctx):
+        self.events += 1
+    def yajl_start_array(self, ctx):
+        self.events += 1
+    def yajl_end_array(self, ctx):
+        self.events += 1
+
+def peak_memory(func):
+    '''
+    Run ``func`` once with :mod:`tracemalloc` tracing the allocations.
+
+    :returns: peak size in bytes of the memory allocated by python while
+        ``func`` runs, on top of what was allocated before, or None when
+        tracemalloc is not available. The memory yajl allocates itself is
+        not traced, it is small compared to the python objects.
+    '''
+    if tracemalloc is None:
+        return None
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def _time(func, repeat):
+    ''' :returns: best time of ``repeat`` calls of ``func`` '''
+    gc.collect()
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+def bench_corpus(name, doc, buf_sizes, repeat):
+    '''
+    :returns: list of the results of each benchmark of the corpus ``doc``
+    '''
+    multiple = name == 'ndjson'
+    results = []
+    def record(bench, func, size, events=None, buf_siz=None):
+        seconds = _time(func, repeat)
+        results.append({
+            'corpus': name,
+            'bench': bench,
+            'buf_siz': buf_siz,
+            'bytes': size,
+            'seconds': seconds,
+            'mb_per_s': size / seconds / 2**20,
+            'events_per_s': events / seconds if events else None,
+            'peak_memory': peak_memory(func),
+        })
+    for buf_siz in buf_sizes:
+        def parse():
+            handler = CountingContentHandler()
+            parser = YajlParser(handler, buf_siz)
+            parser.allow_multiple_values = multiple
+            parser.parse(io.BytesIO(doc))
+            return handler.events
+        events = parse()
+        record('parse', parse, len(doc), events, buf_siz)
+        record('load', lambda: load(io.BytesIO(doc), buf_siz=buf_siz,
+                                    allow_multiple_values=multiple),
+               len(doc), events, buf_siz)
+    obj = loads(doc, allow_multiple_values=multiple)
+    out = dumps(obj, encoding=None)
+    record('dumps', lambda: dumps(obj, encoding=None), len(out), events)
+    return results
+
+def run(size=4 * 2**20, buf_sizes=(4096, 65536, 2**20), repeat=3,
+        names=None):
+    '''
+    :type size: int
+    :param size: minimum size in bytes of each corpus
+    :param buf_sizes: ``buf_siz`` values of the parsing benchmarks
+    :type repeat: int
+    :param repeat: number of runs of each benchmark, the best one is kept
+    :param names: names of the corpora to run, all by default
+    :returns: dict of the environment and the benchmark results
+    :raises ValueError: When a name is not the name of a corpus
+
+    Each corpus is only generated when its benchmarks are about to run.
+    '''
+    generators = [
+        (name, _generator(name)) for name in sorted(names or _corpora)
+    ]
+    results = []
+    for name, generate in generators:
+        results.extend(bench_corpus(name, generate(size), buf_sizes, repeat))
+    return {
+        'yajl_py_version': __version__,
+        'yajl_version': yajl_version,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
@@ -0,0 +1,51 @@
+'''
+Run the yajl-py benchmarks, see :mod:`yajl.bench`
+'''
+
+import json
+import sys
+import optparse
+from . import run, yajl_version
+
+def main():
+    opt_parser = optparse.OptionParser(
+        description='benchmark yajl-py over synthetic JSON corpora',
+        version='Yajl-Py for Yajl %s' %yajl_version)
+    opt_parser.add_option("-s",
+        dest="size", type="float", default=4,
+        help="size in MB of each corpus")
+    opt_parser.add_option("-b",
+        dest="buf_sizes", default="4096,65536,1048576",
+        help="comma separated buf_siz values used to parse")
+    opt_parser.add_option("-r",
+        dest="repeat", type="int", default=3,
+        help="number of times to repeat each benchmark")
+    opt_parser.add_option("-c",
+        dest="corpora", default=None,
+        help="comma separated names of the corpora to run "
+             "(deep, wide, records, strings, numbers, ndjson)")
+    opt_parser.add_option("-o",
+        dest="output", default=None,
+        help="file to save the results to as JSON")
+    (options, args) = opt_parser.parse_args()
+    report = run(
+        size=int(options.size * 2**20),
+        buf_sizes=[int(b) for b in options.buf_sizes.split(',')],
+        repeat=options.repeat,
+        names=options.corpora and options.corpora.split(','))
+    for r in report['results']:
+        sys.stderr.write(
+            '%-8s %-6s %8s %9.2f MB/s %12s events/s %9s MB peak\n' %(
+            r['corpus'], r['bench'], r['buf_siz'] or '-', r['mb_per_s'],
+            '%.0f' %r['events_per_s'] if r['events_per_s'] else '-',
+            '%.2f' %(r['peak_memory'] / 2.0**20)
+            if r['peak_memory'] is not None else '-'))
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+'''
+Random access to the values of a multi-value stream (NDJSON or concatenated
+JSON), through an index of the byte offsets of each top level value::
+
+    index = open_index('dump.ndjson')  # built once, saved as dump.ndjson.idx
+    record = index.values('dump.ndjson', 1000000)[0]
+
+The index is built in a single pass: while yajl parses, the callbacks of
+the containers and top level scalars read the position of the lexer with
+``yajl_get_bytes_consumed``. Values nested in a container are not reported
+to python, except for scalars (yajl has no way to skip them).
+'''
+
+import os
+from array import array
+from ctypes import byref
+from .yajl_common import yajl
+from .yajl_parse import (
+    YajlParser, _configure, loads, yajl_callbacks, YAJL_NULL, YAJL_BOOL,
+    YAJL_INT, YAJL_DBL, YAJL_NUM, YAJL_STR, YAJL_SDCT, YAJL_DCTK, YAJL_EDCT,
+    YAJL_SARR, YAJL_EARR,
+)
+
+def _index_callbacks(parser, offsets, state):
+    '''
+    :returns: a :class:`yajl_callbacks` reference appending the start and
+        end offsets of each top level value to ``offsets``.
+        ``state[0]`` is the offset of the buffer being parsed, ``state[1]``
+        the offset where the input ends so far.
+    '''
+    depth = [0]
+    get_bytes_consumed = yajl.yajl_get_bytes_consumed
+    append = offsets.append
+    def position():
+        # within the buffer being parsed, capped for yajl_complete_parse
+        # which parses an extra space
+        return min(state[0] + get_bytes_consumed(parser._hand), state[1])
+    def scalar(ctx, *args):
+        if not depth[0]:
+            end = position()
+            # a scalar starts after the whitespace following the last value
+            append(offsets[-1] if offsets else 0)
+            append(end)
+        return 1
+    def start(ctx):
+        if not depth[0]:
+            # right after the opening bracket
+            append(position() - 1)
+        depth[0] += 1
+        return 1
+    def end(ctx):
+        depth[0] -= 1
+        if not depth[0]:
+            append(position())
+        return 1
+    return byref(yajl_callbacks(
+        YAJL_NULL(scalar), YAJL_BOOL(scalar), YAJL_INT(0), YAJL_DBL(0),
+        YAJL_NUM(scalar), YAJL_STR(scalar),
+        YAJL_SDCT(start), YAJL_DCTK(0), YAJL_EDCT(end),
+        YAJL_SARR(start), YAJL_EARR(end),
+    ))
+
+def _open(f):
+    '''
+    :returns: ``(file, close)``, ``f`` opened for reading when it is a path
+    '''
+    if hasattr(f, 'read'):
+        return f, False
+    return open(f, 'rb'), True
+
+class YajlIndex(object):
+    '''
+    Start and end byte offsets of each top level value of a stream.
+
+    .. attribute:: offsets
+
+        ``array('Q')`` of the start and end offsets of the values, one pair
+        after the other. The start of a top level scalar includes the
+        whitespace that precedes it.
+    '''
+    def __init__(self, offsets=None):
+        self.offsets = offsets if offsets is not None else array('Q')
+
+    @classmethod
+    def build(cls, f, buf_siz=65536, **kwargs):
+        '''
+        Index the values of ``f`` in a single pass.
+
+        :param f: path or binary stream of the JSON values
+        :type buf_siz: int
+        :param buf_siz: see :class:`YajlParser`
+        :param kwargs: parser configuration, see :class:`YajlParser`, e.g.
+            ``allow_comments=True``
+        :rtype: :class:`YajlIndex`
+        :raises YajlError: When invalid JSON is found
+        :raises YajlConfigError: When a keyword argument is not a yajl option
+        '''
+        index = cls()
+        parser = YajlParser(buf_siz=buf_siz)
+        parser.allow_multiple_values = True
+        _configure(parser, kwargs)
+        state = [0, 0]
+        parser.callbacks = _index_callbacks(parser, index.offsets, state)
+        f, close = _open(f)
+        try:
+            for data in parser._read(f):
+                state[1] = state[0] + len(data)
+                parser.feed(data)
+                state[0] = state[1]
+            parser.close()
+        finally:
+            if close:
+                f.close()
+        return index
+
+    @classmethod
+    def from_file(cls, path):
+        '''
+        :returns: the :class:`YajlIndex` saved at ``path`` by :meth:`save`
+        '''
+        offsets = array('Q')
+        size = os.path.getsize(path)
+        if size % (2 * offsets.itemsize):
+            raise ValueError('%s is not a yajl index' %path)
+        with open(path, 'rb') as f:
+            offsets.fromfile(f, size // offsets.itemsize)
+        return cls(offsets)
+
+    def save(self, path):
+        '''
+        Save the offsets to ``path``, as 64 bit unsigned integers in the
+        native byte order.
+        '''
+        with open(path, 'wb') as f:
+            self.offsets.tofile(f)
+
+    def __len__(self):
+        return len(self.offsets) // 2
+
+    def __getitem__(self, i):
+        '''
+        :returns: ``(start, end)`` offsets of value ``i``
+        '''
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('index out of range')
+        return self.offsets[2 * i], self.offsets[2 * i + 1]
+
+    def read(self, f, start, stop=None):
+        '''
+        :param f: path or seekable binary stream the index was built from
+        :type start: int
+        :param start: first value to read
+        :type stop: int
+        :param stop: value to stop before, ``start + 1`` by default
+        :returns: the bytes holding the values ``start`` to ``stop``, and
+            whatever separates them
+        '''
+        n = len(self)
+        if start < 0:
+            start += n
+        if stop is None:
+            stop = start + 1
+        start, stop, step = slice(start, stop).indices(n)
+        if start >= stop:
+            return b''
+        begin = self[start][0]
+        end = self[stop - 1][1]
+        f, close = _open(f)
+        try:
+            f.seek(begin)
+            return f.read(end - begin)
+        finally:
+            if close:
+                f.close()
+
+    def values(self, f, start, stop=None, encoding='utf-8', **kwargs):
+        '''
+        Parse the values ``start`` to ``stop``, see :meth:`read`.
+
+        :param kwargs: see :func:`yajl.loads`
+        :returns: list of the parsed values
+        '''
+        data = self.read(f, start, stop)
+        if not data:
+            return []
+        return loads(data, encoding, allow_multiple_values=True, **kwargs)
+
+def open_index(path, sidecar=None, **kwargs):
+    '''
+    :type path: string
+    :param path: file of JSON values
+    :type sidecar: string
+    :param sidecar: file the index is saved to, ``path + '.idx'`` by
+        default. It is reused while it is newer than ``path``, otherwise
+        the index is built again with :meth:`YajlIndex.build` and saved.
+    :param kwargs: see :meth:`YajlIndex.build`
+    :rtype: :class:`YajlIndex`
+    '''
+    if sidecar is None:
+        sidecar = path + '.idx'
+    try:
+        if os.path.getmtime(sidecar) >= os.path.getmtime(path):
+            return YajlIndex.from_file(sidecar)
+    except (OSError, ValueError):
+        pass
+    index = YajlIndex.build(path, **kwargs)
+    index.save(sidecar)
+    return index
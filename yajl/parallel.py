@@ -0,0 +1,114 @@
+'''
+Parse newline delimited JSON (one JSON value per line) on many processes.
+
+The input file is split at newline boundaries into one byte range per
+part, and each range is parsed in a worker process by its own
+:class:`YajlParser`, with ``allow_multiple_values`` set.
+'''
+
+import os
+from multiprocessing import Pool, cpu_count
+from .yajl_parse import YajlParser, _configure, _check_options
+
+def _skip_blank(f):
+    '''
+    Reads the lines of ``f`` holding only whitespace
+
+    :returns: the offset of the first other line, or of the end of ``f``
+    '''
+    while True:
+        pos = f.tell()
+        line = f.readline()
+        if not line or line.strip(b' \t\r\n'):
+            return pos
+
+def split_ndjson(path, parts):
+    '''
+    :returns: list of ``(start, end)`` byte ranges covering the file at
+        ``path`` but its leading blank lines, each starting at the beginning
+        of a line which is not blank, as a range of blank lines alone is not
+        valid JSON. At most ``parts`` ranges are returned, fewer when the
+        lines are too long to split the file any further.
+    '''
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        bounds = [_skip_blank(f)]
+        for i in range(1, parts):
+            pos = size * i // parts
+            if pos <= bounds[-1]:
+                continue
+            # move to the start of the line following pos - 1
+            f.seek(pos - 1)
+            f.readline()
+            pos = _skip_blank(f)
+            if pos >= size:
+                break
+            bounds.append(pos)
+    return [
+        (start, end)
+        for start, end in zip(bounds, bounds[1:] + [size])
+        if start < end
+    ]
+
+def _parse_range(args):
+    '''
+    Worker, parses the byte range ``start:end`` of ``path``
+
+    :returns: the content handler used to parse the range
+    '''
+    path, start, end, handler_factory, buf_siz, config = args
+    content_handler = handler_factory()
+    parser = YajlParser(content_handler, buf_siz)
+    parser.allow_multiple_values = True
+    _configure(parser, config)
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining:
+            data = f.read(min(buf_siz, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            parser.feed(data)
+    parser.close()
+    return content_handler
+
+def parse_ndjson(path, handler_factory, processes=None, reduce=None,
+        parts=None, buf_siz=65536, **kwargs):
+    '''
+    :type path: string
+    :param path: file holding one JSON value per line
+    :param handler_factory: picklable callable (e.g. a
+        :class:`YajlContentHandler` subclass) returning a new content
+        handler, one is created per range of the file
+    :type processes: int
+    :param processes: number of worker processes, one per cpu by default
+    :param reduce: called with the list of content handlers, in file
+        order, once all the ranges are parsed. Its result is returned.
+        The handlers are sent back from the workers, so they must be
+        picklable.
+    :type parts: int
+    :param parts: number of ranges to split the file in, ``processes`` by
+        default
+    :type buf_siz: int
+    :param buf_siz: see :class:`YajlParser`
+    :param kwargs: parser configuration, see :class:`YajlParser`
+    :returns: the result of ``reduce``, or the list of content handlers
+    :raises YajlError: When invalid JSON is found in any of the ranges
+    :raises YajlConfigError: When a keyword argument is not a yajl option
+    '''
+    _check_options(kwargs)
+    processes = processes or cpu_count()
+    ranges = split_ndjson(path, parts or processes)
+    pool = Pool(processes)
+    try:
+        handlers = pool.map(_parse_range, [
+            (path, start, end, handler_factory, buf_siz, kwargs)
+            for start, end in ranges
+        ], chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+    if reduce is None:
+        return handlers
+    return reduce(handlers)
@@ -0,0 +1,106 @@
+'''
+Pools of preconfigured :class:`YajlParser` or :class:`YajlGen` instances for
+multi-threaded servers.
+
+Instances hold a yajl handle and cannot be shared between threads, a pool
+hands each thread its own instance instead of building one per request::
+
+    parsers = YajlPool(lambda: YajlParser(batch_events=True))
+    with parsers.checkout() as parser:
+        events = list(parser.events(body))
+
+    gens = YajlPool(lambda: YajlGen(beautify=False),
+                    reset=lambda g: g.yajl_gen_reset())
+'''
+
+import time
+import threading
+from contextlib import contextmanager
+
+_now = getattr(time, 'monotonic', time.time)
+
+class YajlPool(object):
+    '''
+    Thread safe pool of instances created by ``factory``.
+    '''
+    def __init__(self, factory, max_size=8, max_idle=60.0, reset=None):
+        '''
+        :param factory: called without arguments to create an instance
+        :type max_size: int
+        :param max_size: number of idle instances kept, instances checked
+            in while the pool is full are dropped
+        :type max_idle: float
+        :param max_idle: seconds after which an idle instance is dropped,
+            None keeps them forever
+        :param reset: called with each instance checked in, to clear any
+            state left by its last user, e.g. ``YajlGen.yajl_gen_reset``
+        '''
+        self.factory = factory
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.reset = reset
+        self._idle = []  # (checkin time, instance), oldest first
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def __len__(self):
+        ''' number of idle instances '''
+        return len(self._idle)
+
+    def _evict(self, now):
+        ''' drop the instances idle for more than max_idle, lock held '''
+        if self.max_idle is None:
+            return
+        idle = self._idle
+        n = 0
+        while n < len(idle) and now - idle[n][0] > self.max_idle:
+            n += 1
+        del idle[:n]
+
+    def acquire(self):
+        '''
+        :returns: the most recently used idle instance, or a new one
+        '''
+        with self._lock:
+            self._evict(_now())
+            if self._idle:
+                return self._idle.pop()[1]
+        return self.factory()
+
+    def release(self, instance):
+        '''
+        Give back an instance obtained from :meth:`acquire`.
+        '''
+        if self.reset is not None:
+            self.reset(instance)
+        with self._lock:
+            now = _now()
+            self._evict(now)
+            if len(self._idle) < self.max_size:
+                self._idle.append((now, instance))
+
+    @contextmanager
+    def checkout(self):
+        '''
+        Context manager acquiring an instance, released on exit. An
+        instance whose use raised an exception is dropped.
+        '''
+        instance = self.acquire()
+        yield instance
+        self.release(instance)
+
+    def local(self):
+        '''
+        :returns: the instance of the current thread, created on first use
+            and kept for the lifetime of the thread, outside of the pool
+        '''
+        try:
+            return self._local.instance
+        except AttributeError:
+            instance = self._local.instance = self.factory()
+            return instance
+
+    def clear(self):
+        ''' drop all idle instances '''
+        with self._lock:
+            del self._idle[:]
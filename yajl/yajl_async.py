@@ -0,0 +1,75 @@
+'''
+asyncio support, parse JSON from a :class:`asyncio.StreamReader` or an
+asynchronous iterable of bytes without blocking the event loop.
+
+Only available from python 3.6.
+'''
+
+import asyncio
+from .yajl_common import YajlConfigError
+from .yajl_parse import YajlParser
+
+class AsyncYajlParser(YajlParser):
+    '''
+    A :class:`YajlParser` reading its input from asyncio streams. Each
+    buffer is passed to the same yajl handle as it arrives, and control is
+    given back to the event loop between buffers.
+    '''
+    async def _buffers(self, stream):
+        '''
+        :returns: asynchronous generator of the buffers read from ``stream``
+        '''
+        if hasattr(stream, 'read'):
+            while 1:
+                data = await stream.read(self.buf_siz)
+                if not data:
+                    break
+                yield data
+        else:
+            async for data in stream:
+                yield data
+
+    def _abort(self):
+        ''' Free the handle of a parse that will not be completed '''
+        hand, self._hand = self._hand, None
+        if hand is not None:
+            self._release(hand, self._hand_key, False)
+
+    async def parse(self, stream):
+        '''
+        Function to parse a JSON stream, calling the content handler as
+        :meth:`YajlParser.parse` does.
+
+        :param stream: object with a coroutine ``read(n)`` method such as
+            :class:`asyncio.StreamReader`, or an asynchronous iterable of
+            bytes
+        :raises YajlError: When invalid JSON in input stream found
+        '''
+        self.feed(b'')
+        try:
+            async for data in self._buffers(stream):
+                self.feed(data)
+                await asyncio.sleep(0)
+            self.close()
+        except BaseException:
+            self._abort()
+            raise
+
+    async def events(self, stream):
+        '''
+        Asynchronous version of :meth:`YajlParser.events`.
+
+        :returns: asynchronous generator of ``(event, value)`` tuples
+        '''
+        if self.batch is None:
+            raise YajlConfigError('Pulling events requires batch_events=True')
+        self.feed(b'')
+        try:
+            async for data in self._buffers(stream):
+                for event in self.feed(data):
+                    yield event
+                await asyncio.sleep(0)
+            for event in self.close():
+                yield event
+        finally:
+            self._abort()
@@ -7,11 +7,14 @@ Common functions and members used by yajl-py (parse and gen)
     used to call any external api functions exported by yajl into libyajl.
 '''
 
+import time
 from ctypes import (
     cdll, c_void_p, c_char_p, c_size_t, c_bool,
     c_int, c_longlong, c_double,
 )
 
+_now = getattr(time, 'perf_counter', time.time)
+
 class YajlException(Exception):
     pass
 
@@ -20,10 +23,131 @@ class YajlConfigError(YajlException):
 
 class YajlError(YajlException):
     def __init__(self, value=''):
+        # passed on so that the error survives pickling (multiprocessing)
+        super(YajlError, self).__init__(value)
         self.value = value
     def __str__(self):
         return self.value
 
+class YajlStats(object):
+    '''
+    Counters collected by a :class:`YajlParser` or a :class:`YajlGen`
+    created with ``stats=True``, accumulated until :meth:`reset`.
+
+    .. attribute:: calls
+
+        dict of the number of calls of each callback (parser) or yajl_gen
+        function (generator), by name
+
+    .. attribute:: chunks
+
+        number of buffers passed to ``yajl_parse``, or of output chunks
+        retrieved or written to ``out`` by the generator
+
+    .. attribute:: bytes
+
+        number of bytes consumed by ``yajl_parse``, or generated
+
+    .. attribute:: yajl_time
+
+        seconds spent in calls to yajl, including the ctypes trampolines
+        and the copies of strings, excluding the content handler
+
+    .. attribute:: handler_time
+
+        seconds spent in content handler methods, called back by yajl or
+        once per buffer (``yajl_events``, ``parse_buf``), or writing to
+        ``out`` for the generator
+    '''
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.calls = {}
+        self.chunks = 0
+        self.bytes = 0
+        self.yajl_time = 0.0
+        self.handler_time = 0.0
+
+    def __repr__(self):
+        return '<YajlStats chunks=%d bytes=%d yajl_time=%.6f ' \
+            'handler_time=%.6f calls=%r>' %(self.chunks, self.bytes,
+            self.yajl_time, self.handler_time, self.calls)
+
+    def counted(self, name, func):
+        '''
+        :returns: ``func`` wrapped to count its calls under ``name``
+        '''
+        calls = self.calls
+        calls.setdefault(name, 0)
+        def counted(*args):
+            calls[name] += 1
+            return func(*args)
+        return counted
+
+    def handler(self, name, func):
+        '''
+        :returns: ``func``, a content handler method, wrapped to count its
+            calls and time them as :attr:`handler_time`
+        '''
+        calls = self.calls
+        calls.setdefault(name, 0)
+        def handler(*args):
+            calls[name] += 1
+            start = _now()
+            try:
+                return func(*args)
+            finally:
+                self.handler_time += _now() - start
+        return handler
+
+    def yajl_call(self, func, name=None):
+        '''
+        :returns: ``func``, a yajl function, wrapped to time its calls as
+            :attr:`yajl_time`, less the time spent in handlers meanwhile,
+            and count them under ``name`` when given
+        '''
+        calls = self.calls
+        if name is not None:
+            calls.setdefault(name, 0)
+        def yajl_call(*args):
+            if name is not None:
+                calls[name] += 1
+            handler_time = self.handler_time
+            start = _now()
+            try:
+                return func(*args)
+            finally:
+                self.yajl_time += (
+                    _now() - start - (self.handler_time - handler_time))
+        return yajl_call
+
+    def output(self, func):
+        '''
+        :returns: ``func``, writing generated output, wrapped to count the
+            chunks and bytes written and time them as :attr:`handler_time`
+        '''
+        timed = self.handler('write', func)
+        def output(data):
+            self.chunks += 1
+            self.bytes += len(data)
+            return timed(data)
+        return output
+
+    def yajl_parse(self, func):
+        '''
+        :returns: ``func``, ``yajl_parse``, wrapped as by :meth:`yajl_call`
+            and counting the chunks and bytes consumed
+        '''
+        timed = self.yajl_call(func)
+        def yajl_parse(hand, data, length):
+            try:
+                return timed(hand, data, length)
+            finally:
+                self.chunks += 1
+                self.bytes += yajl.yajl_get_bytes_consumed(hand)
+        return yajl_parse
+
 def load_yajl():
     '''
     To be used internally by yajl-py to preload the yajl shared object
@@ -74,7 +198,7 @@ yajl.yajl_free_error.argtypes = [c_void_p, c_char_p]
 # Yajl Gen
 yajl.yajl_gen_config.argtypes = [c_void_p, c_int]
 yajl.yajl_gen_alloc.restype = c_void_p
-yajl.yajl_gen_alloc_argtypes = [c_void_p]
+yajl.yajl_gen_alloc.argtypes = [c_void_p]
 yajl.yajl_gen_free.restype = None
 yajl.yajl_gen_free.argtypes = [c_void_p]
 yajl.yajl_gen_integer.argtypes = [c_void_p, c_longlong]
@@ -3,10 +3,19 @@ Code that allows use of api/yajl_gen.h
 
 '''
 
-from .yajl_common import YajlError, yajl
+import re
+import six
+from functools import partial
+from .yajl_common import YajlError, YajlConfigError, YajlStats, yajl
+import sys
+from json.encoder import encode_basestring
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
 from ctypes import (
-    POINTER, byref, string_at, c_ubyte, c_char_p,
-    c_int, c_uint, c_longlong, c_double,
+    POINTER, CFUNCTYPE, byref, string_at, memmove, addressof,
+    c_ubyte, c_char, c_int, c_uint, c_size_t, c_void_p,
 )
 
 yajl_gen_status = {
@@ -29,6 +38,124 @@ yajl_gen_validate_utf8,
 yajl_gen_escape_solidus,
 ) = map(c_int, [2**x for x in range(5)])
 
+# yajl_gen options, by the name of the YajlGen keyword argument setting them
+_config_map = dict([
+    ('beautify', yajl_gen_beautify),
+    ('indent', yajl_gen_indent_string),
+    ('indent_string', yajl_gen_indent_string),
+    ('print_callback', yajl_gen_print_callback),
+    ('validate_utf8', yajl_gen_validate_utf8),
+    ('gen_escape_solidus', yajl_gen_escape_solidus),
+])
+
+def _indent_string(indent):
+    '''
+    :returns: ``indent`` as the bytes yajl indents with, an int being a
+        number of spaces and text being encoded
+    :raises YajlConfigError: When ``indent`` is not whitespace, which yajl
+        rejects
+    '''
+    if isinstance(indent, six.integer_types) and not isinstance(indent, bool):
+        indent = b' ' * indent
+    elif isinstance(indent, six.text_type):
+        indent = indent.encode('utf-8')
+    if not isinstance(indent, bytes) or indent.strip(b' \t\n\v\f\r'):
+        raise YajlConfigError(
+            'Indent (indent) must be whitespace, or a number of spaces')
+    return indent
+
+YAJL_PRINT = CFUNCTYPE(None, c_void_p, c_void_p, c_size_t)
+
+def _encode_float(v, precision=None):
+    '''
+    :returns: json text of the float ``v``, the shortest text reading back
+        the same float (rather than yajl_gen_double's ``%.20g``) by default
+    '''
+    text = float.__repr__(v) if precision is None else '%.*g' %(precision, v)
+    if text[-1] in 'nf': # nan, inf and -inf
+        raise YajlGenException(yajl_gen_status[5])
+    return text
+
+# strings, generated as json strings even though bytes are buffers
+_strings = (six.text_type, bytes, bytearray)
+
+# struct formats of the buffers generated as arrays of numbers
+_int_formats = frozenset('bBhHiIlLqQnN')
+_float_formats = frozenset('efd')
+
+def _buffer_values(obj):
+    '''
+    :returns: the values of ``obj`` as a (nested) list of ints or floats, or
+        None if ``obj`` is not a buffer of numbers
+    '''
+    if isinstance(obj, _strings + (list, tuple)):
+        return None
+    try:
+        view = memoryview(obj)
+    except TypeError:
+        return None
+    fmt = view.format.lstrip('@=<>!')
+    if fmt not in _int_formats and fmt not in _float_formats:
+        return None
+    return view.tolist()
+
+def _numbers_text(values, precision=None):
+    '''
+    :returns: json array of the (nested) list of ints or floats ``values``
+    '''
+    if values and values[0].__class__ is list:
+        return '[%s]' % ','.join([
+            _numbers_text(v, precision) for v in values])
+    if values and values[0].__class__ is float:
+        if precision is None:
+            text = ','.join(map(repr, values))
+        else:
+            text = ','.join(map(('%%.%dg' % precision).__mod__, values))
+        if 'n' in text: # nan, inf and -inf
+            raise YajlGenException(yajl_gen_status[5])
+        return '[' + text + ']'
+    return '[' + ','.join(map(str, values)) + ']'
+
+# escapes of yajl_gen_string, control characters take upper case hex digits
+_escapes = {
+    u'\\': u'\\\\', u'"': u'\\"', u'\b': u'\\b', u'\f': u'\\f',
+    u'\n': u'\\n', u'\r': u'\\r', u'\t': u'\\t',
+}
+for _i in range(0x20):
+    _escapes.setdefault(six.unichr(_i), u'\\u%04X' % _i)
+_escaped = re.compile(u'[\\x00-\\x1f\\\\"]')
+
+def _encode_text(s):
+    '''
+    :returns: json text of the string ``s``, escaped as yajl_gen_string does
+    '''
+    text = encode_basestring(s)
+    if u'\\u00' not in text:
+        return text
+    # json escapes control characters with lower case hex digits
+    return u'"' + _escaped.sub(lambda m: _escapes[m.group(0)], s) + u'"'
+
+# json text of the scalar values, keyed on type
+_scalars = {
+    type(None): lambda v: 'null',
+    bool: lambda v: 'true' if v else 'false',
+    float: _encode_float,
+    six.text_type: _encode_text,
+    bytes: lambda v: _encode_text(v.decode('utf-8')),
+}
+for _t in six.integer_types:
+    _scalars[_t] = str
+
+# functions taking the yajl_gen handle as first argument, bound to the
+# handle of each YajlGen
+_yajl_gen_funcs = (
+    'yajl_gen_config', 'yajl_gen_free', 'yajl_gen_reset', 'yajl_gen_get_buf',
+    'yajl_gen_clear', 'yajl_gen_null', 'yajl_gen_bool', 'yajl_gen_integer',
+    'yajl_gen_double', 'yajl_gen_number', 'yajl_gen_string',
+    'yajl_gen_map_open', 'yajl_gen_map_close', 'yajl_gen_array_open',
+    'yajl_gen_array_close',
+)
+
 class YajlGenException(YajlError):
     pass
 
@@ -37,12 +164,27 @@ class YajlGen(object):
     Yajl Generator - json formatting using yajl_gen
 
     '''
-    def __init__(self, **kwargs):
+    def __init__(self, out=None, flush_threshold=65536, stats=False,
+            **kwargs):
         '''
+        :param out: file like object (with a ``write`` method, e.g. a file
+            opened in binary mode or ``socket.makefile('wb')``) the
+            generated JSON is written to, instead of being retrieved with
+            :meth:`yajl_gen_get_buf`
+        :type flush_threshold: int
+        :param flush_threshold: size of the buffer collecting the output
+            before it is written to ``out``. ``out.write`` is passed a
+            memoryview into that buffer, which is reused once it returns.
+        :type stats: bool
+        :param stats: collect a :class:`YajlStats` in :attr:`stats`, the
+            yajl_gen functions are only wrapped to do so when set
         :param beautify: To pretty print json (or not)
         :type beautify: bool
-        :param indent: only valid when beautify=True
-        :type indent: string
+        :param indent: only valid when beautify=True, also accepted as
+            ``indent_string``. Either whitespace or a number of spaces.
+        :type indent: bytes, string or int
+        :raises YajlConfigError: When an option is not a yajl_gen option,
+            or yajl rejects its value
 
         .. attribute:: g
 
@@ -50,20 +192,91 @@ class YajlGen(object):
             :cfunc:`yajl.yajl_gen_alloc`.
             This should not be used directly.
         '''
+        unknown = sorted(set(kwargs) - set(_config_map))
+        if unknown:
+            raise YajlConfigError(
+                'Unknown generator option(s): %s' %', '.join(unknown))
+        # yajl keeps a pointer to the indent string, it must outlive self.g
+        self._indent = None
+        for k in ('indent', 'indent_string'):
+            if k in kwargs:
+                self._indent = kwargs[k] = _indent_string(kwargs[k])
         self.g = yajl.yajl_gen_alloc(None)
-        config_map = dict([
-            ('beautify', yajl_gen_beautify),
-            ('indent_string', yajl_gen_indent_string),
-            ('print_callback', yajl_gen_print_callback),
-            ('validate_utf8', yajl_gen_validate_utf8),
-            ('gen_escape_solidus', yajl_gen_escape_solidus),
-        ])
+        self._funcs = dict(
+            (name, partial(getattr(yajl, name), self.g))
+            for name in _yajl_gen_funcs)
+        self.stats = YajlStats() if stats else None
+        if self.stats is not None:
+            self._funcs = dict(
+                (name, self.stats.yajl_call(func, name))
+                for name, func in self._funcs.items())
         for k,v in kwargs.items():
-            self._yajl_gen('yajl_gen_config', config_map[k], v)
+            if not self._yajl_gen('yajl_gen_config', _config_map[k], v):
+                raise YajlConfigError('yajl rejected %s=%r' %(k, v))
+        # values formatted in python (see _scalars) match the output of
+        # _encoder: strings are escaped as yajl does and floats formatted by
+        # _encode_float in both cases. Only beautify and escape_solidus
+        # would make yajl format them differently.
+        self._raw_ok = not (
+            kwargs.get('beautify') or kwargs.get('gen_escape_solidus'))
+        self.out = out
+        if out is not None:
+            self._out_buf = bytearray(flush_threshold)
+            self._out_view = memoryview(self._out_buf)
+            self._out_addr = addressof(
+                (c_char * flush_threshold).from_buffer(self._out_buf))
+            self._out_pos = 0
+            self._out_exc_info = None
+            self._out_write = out.write
+            if self.stats is not None:
+                self._out_write = self.stats.output(out.write)
+            self._print = YAJL_PRINT(self._print_callback)
+            self._yajl_gen(
+                'yajl_gen_config', yajl_gen_print_callback, self._print, None)
+
+    def _print_callback(self, ctx, s, l):
+        '''
+        yajl_print_t collecting the output in ``self._out_buf``
+        '''
+        if self._out_exc_info is not None:
+            return
+        try:
+            if self._out_pos + l > len(self._out_buf):
+                self._write()
+                if l > len(self._out_buf):
+                    self._out_write(string_at(s, l))
+                    return
+            memmove(self._out_addr + self._out_pos, s, l)
+            self._out_pos += l
+        except Exception:
+            # exceptions cannot propagate through yajl, raised by flush
+            self._out_exc_info = sys.exc_info()
+
+    def _write(self):
+        ''' write the buffered output to ``self.out`` '''
+        if self._out_pos:
+            self._out_write(self._out_view[:self._out_pos])
+            self._out_pos = 0
+
+    def flush(self):
+        '''
+        Write the buffered output to ``out``, must be called once done
+        generating.
+
+        :raises: the exception raised by ``out.write`` while generating
+        '''
+        exc_info = self._out_exc_info
+        if exc_info is not None:
+            self._out_exc_info = None
+            six.reraise(*exc_info)
+        self._write()
+        if hasattr(self.out, 'flush'):
+            self.out.flush()
 
     def __del__(self):
-        self._yajl_gen('yajl_gen_free')
-    def yajl_gen_reset(self, sep=''):
+        if hasattr(self, '_funcs'):
+            self._yajl_gen('yajl_gen_free')
+    def yajl_gen_reset(self, sep=b''):
         self._yajl_gen('yajl_gen_reset', sep)
     def _assert_retval(self, retval):
         '''
@@ -87,16 +300,18 @@ class YajlGen(object):
         self._assert_retval(
             self._yajl_gen('yajl_gen_get_buf', byref(buf), byref(l))
         )
+        if self.stats is not None:
+            self.stats.chunks += 1
+            self.stats.bytes += l.value
         try:
             return string_at(buf, l.value)
         finally:
             self._yajl_gen('yajl_gen_clear')
     def _yajl_gen(self, name, *args):
         '''
-        Call the underlying yajl_gen c function/method
-        ``self.g`` must be already allocated
+        Call the underlying yajl_gen c function/method, bound to ``self.g``
         '''
-        return getattr(yajl, name)(self.g, *args)
+        return self._funcs[name](*args)
     def _dispatch(self, name, *args):
         '''
         :param name: yajl func ``name`` to dispatch to
@@ -107,9 +322,9 @@ class YajlGen(object):
         Asserts that the returned value is proper or raises the proper
         ``YajlGenException``
         '''
-        self._assert_retval(
-            self._yajl_gen(name, *args)
-        )
+        retval = self._funcs[name](*args)
+        if retval:
+            self._assert_retval(retval)
     def yajl_gen_null(self):
         ''' Generate json value ``null`` '''
         self._dispatch('yajl_gen_null')
@@ -124,13 +339,13 @@ class YajlGen(object):
         :param n: number to be jsonified
         :type n: int
         '''
-        self._dispatch('yajl_gen_integer', c_longlong(n))
+        self._dispatch('yajl_gen_integer', n)
     def yajl_gen_double(self, n):
         '''
         :param n: number to be jsonified
         :type n: float
         '''
-        self._dispatch('yajl_gen_double', c_double(n))
+        self._dispatch('yajl_gen_double', n)
     def yajl_gen_number(self, s):
         '''
         :param s: number to be jsonified
@@ -139,13 +354,13 @@ class YajlGen(object):
         **Note** to print floats or ints use :meth:`yajl_gen_double`
         or :meth:`yajl_gen_integer` respectively.
         '''
-        self._dispatch('yajl_gen_number', c_char_p(s), len(s))
+        self._dispatch('yajl_gen_number', s, len(s))
     def yajl_gen_string(self, s):
         '''
         :param s: string to be jsonified
         :type s: string
         '''
-        self._dispatch('yajl_gen_string', c_char_p(s), len(s))
+        self._dispatch('yajl_gen_string', s, len(s))
     def yajl_gen_map_open(self):
         ''' indicate json map begin '''
         self._dispatch('yajl_gen_map_open')
@@ -158,3 +373,282 @@ class YajlGen(object):
     def yajl_gen_array_close(self):
         ''' indicate json array close '''
         self._dispatch('yajl_gen_array_close')
+    def _encoder(self):
+        '''
+        :returns: the function generating python objects, see :func:`dumps`
+        '''
+        try:
+            return self._encode
+        except AttributeError:
+            self._encode = _encoder(self, None)
+            return self._encode
+    def _raw(self, text):
+        '''
+        Insert the already formatted json value ``text`` as is, using
+        :cfunc:`yajl_gen_number` which copies its input without validation.
+        '''
+        text = text.encode('utf-8')
+        self._dispatch('yajl_gen_number', text, len(text))
+    def emit_array(self, sequence, precision=None):
+        '''
+        Generate a json array holding the values of ``sequence``
+
+        :param sequence: iterable of values supported by :func:`dumps`, or
+            object supporting the buffer protocol with an integer or float
+            format, e.g. ``array.array`` or a numpy array (multi
+            dimensional arrays are generated as nested arrays). Bytes are
+            a string to :func:`dumps`, wrap them in a ``memoryview`` to
+            generate the array of their values.
+        :type precision: int
+        :param precision: number of significant digits of floats, all the
+            digits needed to read back the same float by default
+        :raises TypeError: When ``sequence`` is a string (text, bytes or
+            bytearray)
+        '''
+        if isinstance(sequence, _strings):
+            raise TypeError('%r is a string, not a sequence of values' %(
+                sequence,))
+        values = _buffer_values(sequence)
+        if values is not None:
+            return self._emit_numbers(values, precision)
+        if self._raw_ok and precision is None:
+            try:
+                text = ','.join([_scalars[v.__class__](v) for v in sequence])
+            except (KeyError, UnicodeDecodeError):
+                pass
+            else:
+                return self._raw('[' + text + ']')
+        encode = self._encoder()
+        self._dispatch('yajl_gen_array_open')
+        for value in sequence:
+            if precision is not None and isinstance(value, float):
+                self._raw(_encode_float(value, precision))
+            else:
+                encode(value)
+        self._dispatch('yajl_gen_array_close')
+    def _emit_numbers(self, values, precision):
+        '''
+        Generate the (nested) list of ints or floats ``values``
+        '''
+        if self._raw_ok:
+            return self._raw(_numbers_text(values, precision))
+        self._dispatch('yajl_gen_array_open')
+        for value in values:
+            if value.__class__ is list:
+                self._emit_numbers(value, precision)
+            elif value.__class__ is float:
+                self._raw(_encode_float(value, precision))
+            else:
+                self._dispatch('yajl_gen_integer', value)
+        self._dispatch('yajl_gen_array_close')
+    def emit_records(self, records, keys):
+        '''
+        Generate a json map per record, with the same ``keys``. The maps are
+        generated into the current container, e.g. after
+        :meth:`yajl_gen_array_open`.
+
+        Unless beautifying, records holding only strings, numbers, bools
+        and None are formatted in python and passed to yajl in one call.
+
+        :param records: iterable of sequences of values, in the order of
+            ``keys``, or of mappings holding at least ``keys``
+        :param keys: the map keys, encoded once for all the records
+        :type keys: list of strings
+        :raises ValueError: When a sequence does not hold one value per key
+        '''
+        encode = self._encoder()
+        funcs = self._funcs
+        gen_number = funcs['yajl_gen_number']
+        gen_string = funcs['yajl_gen_string']
+        gen_map_open = funcs['yajl_gen_map_open']
+        gen_map_close = funcs['yajl_gen_map_close']
+        check = self._assert_retval
+        encoded = [
+            k.encode('utf-8') if isinstance(k, six.text_type) else k
+            for k in keys
+        ]
+        fields = [(k, len(k)) for k in encoded]
+        # '{"a":%s,"b":%s}' with the keys escaped once
+        template = None
+        if self._raw_ok:
+            try:
+                template = '{%s}' % ','.join([
+                    _encode_text(k.decode('utf-8')).replace('%', '%%') + ':%s'
+                    for k in encoded
+                ])
+            except UnicodeDecodeError:
+                # left to yajl, as when beautifying
+                pass
+        scalars = _scalars
+        n = len(keys)
+        for record in records:
+            if isinstance(record, Mapping):
+                record = [record[k] for k in keys]
+            elif len(record) != n:
+                raise ValueError('record %r has %d values for %d keys' %(
+                    record, len(record), n))
+            if template is not None:
+                try:
+                    text = template % tuple([
+                        scalars[v.__class__](v) for v in record
+                    ])
+                except (KeyError, UnicodeDecodeError):
+                    pass
+                else:
+                    text = text.encode('utf-8')
+                    status = gen_number(text, len(text))
+                    if status:
+                        check(status)
+                    continue
+            status = gen_map_open()
+            if status:
+                check(status)
+            for field, value in zip(fields, record):
+                status = gen_string(*field)
+                if status:
+                    check(status)
+                encode(value)
+            status = gen_map_close()
+            if status:
+                check(status)
+
+def _encoder(g, default):
+    '''
+    :returns: function writing a python object into the yajl_gen handle of
+        ``g``, using a table of generator functions keyed on type
+    '''
+    funcs = g._funcs
+    gen_null = funcs['yajl_gen_null']
+    gen_bool = funcs['yajl_gen_bool']
+    gen_integer = funcs['yajl_gen_integer']
+    gen_number = funcs['yajl_gen_number']
+    gen_string = funcs['yajl_gen_string']
+    gen_map_open = funcs['yajl_gen_map_open']
+    gen_map_close = funcs['yajl_gen_map_close']
+    gen_array_open = funcs['yajl_gen_array_open']
+    gen_array_close = funcs['yajl_gen_array_close']
+    check = g._assert_retval
+    def encode_null(obj):
+        status = gen_null()
+        if status:
+            check(status)
+    def encode_bool(obj):
+        status = gen_bool(obj)
+        if status:
+            check(status)
+    def encode_int(obj):
+        if -2**63 <= obj < 2**63:
+            status = gen_integer(obj)
+            if status:
+                check(status)
+        else:
+            s = str(obj).encode('ascii')
+            status = gen_number(s, len(s))
+            if status:
+                check(status)
+    def encode_float(obj):
+        # same text as the values formatted in python, see YajlGen._raw_ok
+        s = _encode_float(obj).encode('ascii')
+        status = gen_number(s, len(s))
+        if status:
+            check(status)
+    def encode_bytes(obj):
+        status = gen_string(obj, len(obj))
+        if status:
+            check(status)
+    def encode_text(obj):
+        obj = obj.encode('utf-8')
+        status = gen_string(obj, len(obj))
+        if status:
+            check(status)
+    def encode_map(obj):
+        status = gen_map_open()
+        if status:
+            check(status)
+        for key, value in obj.items():
+            if key.__class__ is six.text_type:
+                key = key.encode('utf-8')
+            elif not isinstance(key, bytes):
+                raise TypeError('keys must be strings, not %r' %(key,))
+            status = gen_string(key, len(key))
+            if status:
+                check(status)
+            encode(value)
+        status = gen_map_close()
+        if status:
+            check(status)
+    def encode_array(obj):
+        status = gen_array_open()
+        if status:
+            check(status)
+        for value in obj:
+            encode(value)
+        status = gen_array_close()
+        if status:
+            check(status)
+    encoders = {
+        type(None): encode_null,
+        bool: encode_bool,
+        float: encode_float,
+        bytes: encode_bytes,
+        six.text_type: encode_text,
+        dict: encode_map,
+        list: encode_array,
+        tuple: encode_array,
+    }
+    for t in six.integer_types:
+        encoders[t] = encode_int
+    def encode_other(obj):
+        # subclasses of the supported types, then the default hook
+        for t, encoder in [
+            (bool, encode_bool), (six.integer_types, encode_int),
+            (float, encode_float), (bytes, encode_bytes),
+            (six.text_type, encode_text), (dict, encode_map),
+            ((list, tuple), encode_array),
+        ]:
+            if isinstance(obj, t):
+                return encoder(obj)
+        if default is None:
+            raise TypeError('%r is not JSON serializable' %(obj,))
+        encode(default(obj))
+    def encode(obj):
+        encoders.get(obj.__class__, encode_other)(obj)
+    return encode
+
+def dumps(obj, encoding='utf-8', default=None, **kwargs):
+    '''
+    Serialize ``obj`` (dicts, lists, tuples, strings, numbers, bools and
+    None) to JSON using a single yajl_gen handle.
+    Floats are written as their ``repr``, as :mod:`json` does, rather than
+    with the 20 significant digits of :meth:`YajlGen.yajl_gen_double`.
+
+    :type encoding: string
+    :param encoding: used to decode the generated JSON, if ``None`` bytes
+        are returned
+    :param default: called with objects that cannot be serialized, it
+        should return a serializable version of the object or raise a
+        TypeError
+    :param kwargs: generator configuration, see :class:`YajlGen`, e.g.
+        ``beautify=True, indent=b'  '``
+    :raises YajlGenException: When yajl cannot generate the value (e.g.
+        NaN, or nesting deeper than yajl allows)
+    :raises YajlConfigError: When a keyword argument is not a yajl_gen
+        option
+    '''
+    g = YajlGen(**kwargs)
+    _encoder(g, default)(obj)
+    buf = g.yajl_gen_get_buf()
+    return buf.decode(encoding) if encoding else buf
+
+def dump(obj, f, encoding='utf-8', default=None, **kwargs):
+    '''
+    Same as :func:`dumps`, writing the JSON into the file ``f``. If
+    ``encoding`` is ``None``, ``f`` must be opened in binary mode and the
+    output is streamed into it as it is generated.
+    '''
+    if encoding:
+        f.write(dumps(obj, encoding, default, **kwargs))
+        return
+    g = YajlGen(out=f, **kwargs)
+    _encoder(g, default)(obj)
+    g.flush()
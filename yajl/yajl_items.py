@@ -0,0 +1,226 @@
+'''
+Iterate over a JSON stream as ``(prefix, event, value)`` tuples, or over the
+python objects found at a given prefix, without writing a content handler.
+
+A prefix is the dotted path leading to a value: map keys are joined with
+``.`` and every array element adds ``item``. For example in
+``{"a": {"b": [1, 2]}}`` the values ``1`` and ``2`` have the prefix
+``a.b.item``, while the array itself has the prefix ``a.b``.
+'''
+
+import sys
+from array import array
+from ctypes import byref
+from .yajl_parse import (
+    YajlParser, yajl_event_names, yajl_event_boolean, yajl_event_string,
+    yajl_callbacks, _configure, _key_cache, YAJL_NULL, YAJL_BOOL, YAJL_INT,
+    YAJL_DBL, YAJL_NUM, YAJL_STR, YAJL_SDCT, YAJL_DCTK, YAJL_EDCT, YAJL_SARR,
+    YAJL_EARR,
+)
+
+def basic_events(f=sys.stdin, encoding='utf-8', buf_siz=65536, **kwargs):
+    '''
+    :type f: file
+    :param f: stream to parse JSON from
+    :type encoding: string
+    :param encoding: used to decode strings and map keys, if ``None``
+        strings are returned as bytes (map keys are always decoded)
+    :type buf_siz: int
+    :param buf_siz: see :class:`YajlParser`
+    :param kwargs: parser configuration, see :class:`YajlParser`
+    :returns: generator of ``(event, value)`` tuples, where event is one of
+        :data:`yajl_event_names`
+    :raises YajlError: When invalid JSON in input stream found
+    :raises YajlConfigError: When a keyword argument is not a yajl option
+    '''
+    parser = YajlParser(
+        buf_siz=buf_siz, batch_events=True,
+        key_cache=1024, key_encoding=encoding or 'utf-8')
+    _configure(parser, kwargs)
+    names = yajl_event_names
+    batch = parser.batch
+    for fileData in parser._parse_buffers(parser._read(f)):
+        values = batch.values
+        for i, event in enumerate(batch.events):
+            value = values[i]
+            if event == yajl_event_string and encoding:
+                value = value.decode(encoding)
+            elif event == yajl_event_boolean:
+                value = bool(value)
+            yield names[event], value
+
+def prefix_events(f=sys.stdin, encoding='utf-8', buf_siz=65536, **kwargs):
+    '''
+    Same parameters as :func:`basic_events`.
+
+    :returns: generator of ``(prefix, event, value)`` tuples
+    '''
+    stack = []    # prefix of each open container
+    current = ''  # prefix of the next value
+    for event, value in basic_events(f, encoding, buf_siz, **kwargs):
+        if event == 'map_key':
+            prefix = stack[-1]
+            yield prefix, event, value
+            current = prefix + '.' + value if prefix else value
+        elif event == 'start_map':
+            yield current, event, value
+            stack.append(current)
+        elif event == 'start_array':
+            yield current, event, value
+            stack.append(current)
+            current = current + '.item' if current else 'item'
+        elif event == 'end_map' or event == 'end_array':
+            current = stack.pop()
+            yield current, event, value
+        else:
+            yield current, event, value
+
+def _build(event, events):
+    '''
+    :returns: the map or array opened by ``event``, built from the following
+        ``(prefix, event, value)`` tuples of ``events``
+    '''
+    root = {} if event == 'start_map' else []
+    stack = [root]
+    keys = [None]
+    for prefix, event, value in events:
+        if event == 'map_key':
+            keys[-1] = value
+            continue
+        if event == 'end_map' or event == 'end_array':
+            stack.pop()
+            keys.pop()
+            if not stack:
+                return root
+            continue
+        if event == 'start_map':
+            value = {}
+        elif event == 'start_array':
+            value = []
+        top = stack[-1]
+        if top.__class__ is list:
+            top.append(value)
+        else:
+            top[keys[-1]] = value
+        if event == 'start_map' or event == 'start_array':
+            stack.append(value)
+            keys.append(None)
+    return root
+
+def items(f, prefix, encoding='utf-8', buf_siz=65536, **kwargs):
+    '''
+    :type prefix: string
+    :param prefix: the prefix of the values to return, e.g. ``'a.b.item'``
+    :returns: generator of the python objects found at ``prefix``
+
+    Only the matching values are built, so memory is bounded by the size of
+    the largest of them. The other parameters are the same as for
+    :func:`basic_events`.
+    '''
+    events = prefix_events(f, encoding, buf_siz, **kwargs)
+    for current, event, value in events:
+        if current != prefix:
+            continue
+        if event == 'start_map' or event == 'start_array':
+            yield _build(event, events)
+        elif event != 'map_key':
+            yield value
+
+def _column_callbacks(parser, columns, encoding):
+    '''
+    :returns: a :class:`yajl_callbacks` reference appending the numbers of
+        the arrays whose prefix is a key of ``columns`` to the matching
+        array. Exceptions are stored on ``parser`` to be re-raised by
+        :meth:`YajlParser.parse`.
+    '''
+    stack = []            # (prefix, column or None) of each open container
+    state = ['', None]    # prefix of the next value, column receiving it
+    to_key = _key_cache(1024, encoding)
+    def fail(message):
+        try:
+            raise ValueError(message %(state[0],))
+        except ValueError:
+            parser._exc_info = sys.exc_info()
+        return 0
+    def yajl_number(ctx, value):
+        column = state[1]
+        if column is not None:
+            try:
+                column.append(value)
+            except Exception:
+                parser._exc_info = sys.exc_info()
+                return 0
+        return 1
+    def yajl_other(ctx, *args):
+        if state[1] is not None:
+            return fail('non numeric value in the array at %r')
+        return 1
+    def yajl_start_map(ctx):
+        if state[1] is not None:
+            return fail('map in the array at %r')
+        stack.append((state[0], None))
+        state[1] = None
+        return 1
+    def yajl_map_key(ctx, stringVal, stringLen):
+        prefix = stack[-1][0]
+        key = to_key(stringVal, stringLen)
+        state[0] = prefix + '.' + key if prefix else key
+        return 1
+    def yajl_start_array(ctx):
+        if state[1] is not None:
+            return fail('array in the array at %r')
+        prefix = state[0]
+        column = columns.get(prefix)
+        stack.append((prefix, column))
+        state[0] = prefix + '.item' if prefix else 'item'
+        state[1] = column
+        return 1
+    def yajl_end(ctx):
+        state[0] = stack.pop()[0]
+        state[1] = stack[-1][1] if stack else None
+        return 1
+    return byref(yajl_callbacks(
+        YAJL_NULL(yajl_other), YAJL_BOOL(yajl_other),
+        YAJL_INT(yajl_number), YAJL_DBL(yajl_number), YAJL_NUM(0),
+        YAJL_STR(yajl_other), YAJL_SDCT(yajl_start_map),
+        YAJL_DCTK(yajl_map_key), YAJL_EDCT(yajl_end),
+        YAJL_SARR(yajl_start_array), YAJL_EARR(yajl_end),
+    ))
+
+def columns(f, prefixes, typecode='d', numpy=False, buf_siz=65536,
+        **kwargs):
+    '''
+    Collect the numbers of the arrays found at ``prefixes`` into arrays of
+    machine values, without building a python list.
+
+    :param f: stream to parse JSON from, see :meth:`YajlParser.parse`
+    :type prefixes: list of strings
+    :param prefixes: prefixes of the arrays to collect, e.g. ``'a.b'``. The
+        numbers of all the arrays with the same prefix (e.g.
+        ``'rows.item.values'``) are collected into a single array.
+    :type typecode: string
+    :param typecode: type of the collected numbers, see :mod:`array`
+    :type numpy: bool
+    :param numpy: return numpy arrays (sharing the memory of the collected
+        arrays) instead of :class:`array.array`, requires numpy
+    :type buf_siz: int
+    :param buf_siz: see :class:`YajlParser`
+    :param kwargs: parser configuration, see :class:`YajlParser`
+    :returns: dict of the arrays collected at each prefix
+    :raises YajlError: When invalid JSON in input stream found
+    :raises YajlConfigError: When a keyword argument is not a yajl option
+    :raises ValueError: When a collected array holds something else than
+        numbers
+    '''
+    if numpy:
+        import numpy
+    result = dict((prefix, array(typecode)) for prefix in prefixes)
+    parser = YajlParser(buf_siz=buf_siz)
+    _configure(parser, kwargs)
+    parser.callbacks = _column_callbacks(parser, result, 'utf-8')
+    parser.parse(f)
+    if numpy:
+        return dict(
+            (prefix, numpy.frombuffer(values, dtype=typecode))
+            for prefix, values in result.items())
+    return result
@@ -2,13 +2,19 @@
 Code that allows use of api/yajl_parse.h
 '''
 
+import os
+import re
+import errno
 import sys
 import six
 from abc import ABCMeta, abstractmethod
-from .yajl_common import yajl, YajlError, YajlConfigError
+from collections import namedtuple
+from array import array
+from mmap import mmap as _mmap, ACCESS_COPY, ALLOCATIONGRANULARITY
+from .yajl_common import yajl, YajlError, YajlConfigError, YajlStats
 from ctypes import (
-    Structure, CFUNCTYPE, POINTER, byref, string_at,
-    c_void_p, c_char_p, c_ubyte, c_int, c_uint, c_longlong, c_double,
+    Structure, Array, CFUNCTYPE, byref, cast, string_at, addressof,
+    c_void_p, c_char_p, c_char, c_int, c_uint, c_longlong, c_double,
 )
 
 # Callback Functions
@@ -16,10 +22,10 @@ YAJL_NULL = CFUNCTYPE(c_int, c_void_p)
 YAJL_BOOL = CFUNCTYPE(c_int, c_void_p, c_int)
 YAJL_INT  = CFUNCTYPE(c_int, c_void_p, c_longlong)
 YAJL_DBL  = CFUNCTYPE(c_int, c_void_p, c_double)
-YAJL_NUM  = CFUNCTYPE(c_int, c_void_p, POINTER(c_ubyte), c_uint)
-YAJL_STR  = CFUNCTYPE(c_int, c_void_p, POINTER(c_ubyte), c_uint)
+YAJL_NUM  = CFUNCTYPE(c_int, c_void_p, c_void_p, c_uint)
+YAJL_STR  = CFUNCTYPE(c_int, c_void_p, c_void_p, c_uint)
 YAJL_SDCT = CFUNCTYPE(c_int, c_void_p)
-YAJL_DCTK = CFUNCTYPE(c_int, c_void_p, POINTER(c_ubyte), c_uint)
+YAJL_DCTK = CFUNCTYPE(c_int, c_void_p, c_void_p, c_uint)
 YAJL_EDCT = CFUNCTYPE(c_int, c_void_p)
 YAJL_SARR = CFUNCTYPE(c_int, c_void_p)
 YAJL_EARR = CFUNCTYPE(c_int, c_void_p)
@@ -54,6 +60,150 @@ yajl_status_client_canceled,
 yajl_status_error
 ) = map(c_int, range(3))
 
+# event codes, as delivered to :meth:`YajlContentHandler.yajl_events`
+yajl_event_names = (
+    'null', 'boolean', 'integer', 'double', 'number', 'string',
+    'start_map', 'map_key', 'end_map', 'start_array', 'end_array',
+)
+(
+yajl_event_null,
+yajl_event_boolean,
+yajl_event_integer,
+yajl_event_double,
+yajl_event_number,
+yajl_event_string,
+yajl_event_start_map,
+yajl_event_map_key,
+yajl_event_end_map,
+yajl_event_start_array,
+yajl_event_end_array,
+) = range(len(yajl_event_names))
+
+class YajlEventBatch(object):
+    '''
+    The events gathered while parsing a single buffer, used when the
+    :class:`YajlParser` is created with ``batch_events=True``.
+
+    .. attribute:: events
+
+        ``array('B')`` of event codes (``yajl_event_*``), see
+        :data:`yajl_event_names` for their names.
+
+    .. attribute:: values
+
+        list of the values matching each event code, ``None`` for events
+        that carry no value (null, start/end map, start/end array).
+
+    Iterating over the batch yields ``(event, value)`` tuples. The same
+    batch instance is cleared and reused for every buffer, so it is only
+    valid for the duration of the :meth:`YajlContentHandler.yajl_events`
+    call.
+    '''
+    def __init__(self):
+        self.events = array('B')
+        self.values = []
+    def __len__(self):
+        return len(self.events)
+    def __iter__(self):
+        return six.moves.zip(self.events, self.values)
+    def clear(self):
+        del self.events[:]
+        del self.values[:]
+
+# yajl options, by the name of the :class:`YajlParser` attribute setting them
+_yajl_options = (
+    (yajl_allow_comments, 'allow_comments'),
+    (yajl_dont_validate_strings, 'dont_validate_strings'),
+    (yajl_allow_trailing_garbage, 'allow_trailing_garbage'),
+    (yajl_allow_multiple_values, 'allow_multiple_values'),
+    (yajl_allow_partial_values, 'allow_partial_values'),
+)
+
+def _check_options(options):
+    '''
+    :raises YajlConfigError: When a name of the dict ``options`` is not a
+        yajl option, see :class:`YajlParser`
+    '''
+    names = set(name for option, name in _yajl_options)
+    unknown = sorted(set(options) - names)
+    if unknown:
+        raise YajlConfigError(
+            'Unknown parser option(s): %s' %', '.join(unknown))
+
+def _configure(parser, options):
+    '''
+    Set the yajl ``options``, a dict such as ``{'allow_comments': True}``,
+    on ``parser``.
+
+    :raises YajlConfigError: When a name is not a yajl option
+    '''
+    _check_options(options)
+    for k, v in options.items():
+        setattr(parser, k, v)
+
+class YajlCheckpoint(namedtuple('YajlCheckpoint', 'offset state')):
+    '''
+    Point from which a parse of a multi-value stream can be resumed, see
+    :meth:`YajlParser.parse`. ``offset`` is the byte offset following the
+    last completed top level value, ``state`` the value returned by
+    :meth:`YajlContentHandler.checkpoint_state` right after it was parsed.
+    '''
+    __slots__ = ()
+
+# size of the windows of a file mapped by :meth:`YajlParser.parse_file`
+_map_window = 2**26
+
+# finds the first byte that is not whitespace to the yajl lexer
+_non_blank = re.compile(br'[^ \t\n\v\f\r]').search
+
+def _nbytes(view):
+    '''
+    :returns: the size in bytes of the memoryview ``view``, as python 2 has
+        no ``memoryview.nbytes``
+    '''
+    nbytes = view.itemsize
+    for n in view.shape:
+        nbytes *= n
+    return nbytes
+
+def _bytes_at(data, offset):
+    '''
+    :returns: ``c_char`` array over the bytes ``data`` from ``offset``,
+        sharing their memory rather than copying them
+    '''
+    buf = (c_char * (len(data) - offset)).from_address(
+        cast(c_char_p(data), c_void_p).value + offset)
+    # the array does not keep the memory it points to alive
+    buf._data = data
+    return buf
+
+def _key_cache(size, encoding, to_string=string_at):
+    '''
+    :returns: a function with the signature of :func:`ctypes.string_at`
+        returning the same (decoded, when ``encoding`` is set) object for
+        repeated map keys. At most ``size`` keys are kept, the oldest
+        key being evicted first.
+    '''
+    cache = {}
+    def intern_key(stringVal, stringLen):
+        raw = to_string(stringVal, stringLen)
+        try:
+            return cache[raw]
+        except KeyError:
+            pass
+        except TypeError:
+            # view over an unhashable buffer, e.g. a memory map
+            raw = bytes(raw)
+            if raw in cache:
+                return cache[raw]
+        raw = bytes(raw)
+        key = raw.decode(encoding) if encoding else raw
+        if len(cache) >= size:
+            del cache[next(iter(cache))]
+        cache[raw] = key
+        return key
+    return intern_key
+
 class YajlParseCancelled(YajlError):
     def __init__(self):
         self.value = 'Client Callback Cancelled Parse'
@@ -118,18 +268,42 @@ class YajlContentHandler(object):
     @abstractmethod
     def yajl_end_array(self, ctx):
         pass
+    def yajl_events(self, ctx, batch):
+        '''
+        Called once per buffer when the parser is created with
+        ``batch_events=True``, in which case it replaces all the callbacks
+        above. A content handler given to such a parser must override it.
+
+        :type batch: :class:`YajlEventBatch`
+        :param batch: the events parsed from the last buffer
+        '''
     def parse_start(self):
         ''' Called before each stream is parsed '''
     def parse_buf(self):
         ''' Called when a complete buffer has been parsed from the stream '''
     def complete_parse(self):
         ''' Called when the parsing of the stream has finished '''
+    def checkpoint_state(self):
+        '''
+        Called when a checkpoint is taken, see :meth:`YajlParser.parse`.
+
+        :returns: the state of the handler needed to resume the parse after
+            the last completed top level value, it should be picklable
+        '''
+        return None
+    def restore_state(self, state):
+        '''
+        Called after :meth:`parse_start` when resuming a parse with the
+        ``state`` returned by :meth:`checkpoint_state`.
+        '''
 
 class YajlParser(object):
     '''
     A class that utilizes the Yajl C Library
     '''
-    def __init__(self, content_handler=None, buf_siz=65536, **kwargs):
+    def __init__(self, content_handler=None, buf_siz=65536,
+            batch_events=False, string_mode='bytes', key_cache=0,
+            key_encoding=None, stats=False, **kwargs):
         '''
         :type content_handler: :class:`YajlContentHandler`
         :param content_handler: content handler instance hosting the
@@ -137,136 +311,946 @@ class YajlParser(object):
         :type buf_siz: int
         :param buf_siz: number of bytes to process from the input stream
             at a time (minimum 1)
+        :type batch_events: bool
+        :param batch_events: instead of calling a content handler method
+            per event, gather the events of each buffer into a
+            :class:`YajlEventBatch` and pass it to
+            :meth:`YajlContentHandler.yajl_events` once per buffer. The
+            content handler is optional in this mode, the events can be
+            pulled using :meth:`events` or :meth:`feed` instead. A content
+            handler that does not implement ``yajl_events`` raises a
+            :class:`YajlConfigError`.
+        :type string_mode: string
+        :param string_mode: how strings, map keys and numbers are passed
+            to the content handler. ``'bytes'`` (default) passes a copy,
+            ``'view'`` passes a read-only memoryview over the buffer being
+            parsed, avoiding an allocation per string. A view is only valid
+            for the duration of the callback, copy it (``bytes(view)``) to
+            keep it.
+        :type key_cache: int
+        :param key_cache: number of map keys to intern, repeated keys are
+            then passed to :meth:`YajlContentHandler.yajl_map_key` as the
+            same object (never a memoryview). 0 disables the cache.
+        :type key_encoding: string
+        :param key_encoding: when set, cached map keys are decoded using
+            this encoding, only valid with ``key_cache``.
+        :type stats: bool
+        :param stats: collect a :class:`YajlStats` in :attr:`stats`, the
+            callbacks and calls to yajl are only wrapped to do so when set
 
         To configure the parser you need to set attributes. Attribute
         names are similar to that of yajl names less the "yajl_" prefix,
         for example:
             to enable yajl_allow_comments, set self.allow_comments=True
+
+        When allow_multiple_values is set (and neither allow_partial_values
+        nor allow_comments is) the yajl handle is kept after a successful
+        parse and reused by the next one, as long as the configuration and
+        ``ctx`` are unchanged.
         '''
         # input validation
         if buf_siz <= 0:
             raise YajlConfigError('Buffer Size (buf_siz) must be set > 0')
-        c_funcs = (
-            YAJL_NULL, YAJL_BOOL, YAJL_INT, YAJL_DBL, YAJL_NUM,
-            YAJL_STR, YAJL_SDCT, YAJL_DCTK, YAJL_EDCT, YAJL_SARR,
-            YAJL_EARR
-        )
+        if string_mode not in ('bytes', 'view'):
+            raise YajlConfigError(
+                "String mode (string_mode) must be 'bytes' or 'view'")
+        if string_mode == 'view' and batch_events:
+            raise YajlConfigError(
+                "String mode 'view' cannot be used with batch_events")
+        if key_cache < 0:
+            raise YajlConfigError('Key cache size (key_cache) must be >= 0')
+        if key_encoding and not key_cache:
+            raise YajlConfigError('Key encoding requires a key_cache')
+        self.string_mode = string_mode
+        self.key_cache = key_cache
+        self.key_encoding = key_encoding
+        self._set_chunk(b'')
+        self._exc_info = None
+        self._hand = None
+        self._blank = False
+        self._idle_hand = None
+        self.batch = YajlEventBatch() if batch_events else None
+        self.stats = YajlStats() if stats else None
+        # set self's vars
+        self.buf_siz = buf_siz
+        self.content_handler = content_handler
+
+    @property
+    def content_handler(self):
+        '''
+        The :class:`YajlContentHandler` in use. The handler's callback
+        methods are looked up once when it is set, so replacing a method
+        on the handler afterwards requires setting it again.
+        '''
+        return self._content_handler
+
+    @content_handler.setter
+    def content_handler(self, content_handler):
+        if (self.batch is not None and content_handler is not None
+                and not self._overrides(content_handler, 'yajl_events')):
+            raise YajlConfigError(
+                'Content handler must implement yajl_events with batch_events')
+        self._content_handler = content_handler
+        # a kept handle points to the previous callbacks
+        self._drop_idle()
+        if content_handler is None and self.batch is None:
+            self.callbacks = None
+            self._callback_funcs = [None] * len(yajl_callbacks._fields_)
+            return
+        if self.batch is not None:
+            to_key = string_at
+            if self.key_cache:
+                to_key = _key_cache(self.key_cache, self.key_encoding)
+            callbacks = self._batch_callbacks(self.batch, to_key)
+            if self.stats is not None:
+                callbacks = [
+                    self.stats.counted(name, callback)
+                    for (name, c_func), callback in zip(
+                        yajl_callbacks._fields_, callbacks)
+                ]
+        else:
+            callbacks = [
+                self._handler_callback(content_handler, name)
+                for name, c_func in yajl_callbacks._fields_
+            ]
+        # cannot have both number and integer|double
+        if self._implements(content_handler, 'yajl_number'):
+            # if yajl_number is available, it takes precedence
+            callbacks[2] = callbacks[3] = 0
+        else:
+            callbacks[4] = 0
+        self._callback_funcs = callbacks
+        # cast the funcs to C-types, None becomes a NULL callback
+        callbacks = [
+            c_func(callback or 0)
+            for (name, c_func), callback in zip(
+                yajl_callbacks._fields_, callbacks)
+        ]
+        self.callbacks = byref(yajl_callbacks(*callbacks))
+
+    @staticmethod
+    def _implements(content_handler, name):
+        '''
+        :returns: the bound method ``name`` of ``content_handler``, or None
+            when it is missing or left abstract
+        '''
+        method = getattr(content_handler, name, None)
+        if getattr(method, '__isabstractmethod__', False):
+            return None
+        return method
+
+    @staticmethod
+    def _overrides(content_handler, name):
+        '''
+        :returns: whether ``content_handler`` implements ``name`` rather than
+            inheriting the hook of :class:`YajlContentHandler`
+        '''
+        method = getattr(content_handler, name, None)
+        if method is None:
+            return False
+        return getattr(method, '__func__', None) is not \
+            six.get_unbound_function(getattr(YajlContentHandler, name))
+
+    def _hook(self, name):
+        '''
+        :returns: the bound method ``name`` of the content handler, called
+            once per buffer, timed as handler time when :attr:`stats` are
+            collected
+        '''
+        method = getattr(self.content_handler, name)
+        if self.stats is not None:
+            method = self.stats.handler(name, method)
+        return method
+
+    def _handler_callback(self, content_handler, name):
+        '''
+        :returns: a callback calling the bound method ``name`` of
+            ``content_handler`` directly, or None if it is not implemented
+        '''
+        method = self._implements(content_handler, name)
+        if method is None:
+            return None
+        if self.stats is not None:
+            method = self.stats.handler(name, method)
+        if name in ('yajl_number', 'yajl_string', 'yajl_map_key'):
+            if self.string_mode == 'view':
+                to_string = self._string_view
+            else:
+                to_string = string_at
+            if name == 'yajl_map_key' and self.key_cache:
+                to_string = _key_cache(
+                    self.key_cache, self.key_encoding, to_string)
+            def callback(ctx, stringVal, stringLen):
+                try:
+                    method(ctx, to_string(stringVal, stringLen))
+                    return 1
+                except Exception:
+                    self._exc_info = sys.exc_info()
+                    return 0
+        elif name in ('yajl_boolean', 'yajl_integer', 'yajl_double'):
+            def callback(ctx, value):
+                try:
+                    method(ctx, value)
+                    return 1
+                except Exception:
+                    self._exc_info = sys.exc_info()
+                    return 0
+        else:
+            def callback(ctx):
+                try:
+                    method(ctx)
+                    return 1
+                except Exception:
+                    self._exc_info = sys.exc_info()
+                    return 0
+        return callback
+
+    def _set_chunk(self, data):
+        '''
+        Record the buffer about to be passed to yajl_parse, strings that
+        yajl reports from within it can then be viewed without a copy.
+        '''
+        if isinstance(data, bytes):
+            self._chunk = memoryview(data)
+            self._chunk_addr = cast(c_char_p(data), c_void_p).value or 0
+        else:
+            # ctypes array over a buffer, see :meth:`parse_file`
+            self._chunk_addr = addressof(data)
+            try:
+                chunk = memoryview(data).cast('B')
+            except AttributeError:
+                # python 2 cannot cast, view a copy
+                chunk = memoryview(string_at(self._chunk_addr, len(data)))
+            if hasattr(chunk, 'toreadonly'): # python 3.8
+                chunk = chunk.toreadonly()
+            self._chunk = chunk
+        self._chunk_len = len(data)
+
+    def _string_view(self, stringVal, stringLen):
+        '''
+        :returns: memoryview of the string yajl reported at ``stringVal``
+        '''
+        offset = (stringVal or 0) - self._chunk_addr
+        if 0 <= offset <= self._chunk_len - stringLen:
+            return self._chunk[offset:offset + stringLen]
+        # unescaped by yajl or split across buffers, it lives in yajl's own
+        # buffer which is reused, so it has to be copied
+        return memoryview(string_at(stringVal, stringLen))
+
+    def _batch_callbacks(self, batch, to_key=string_at):
+        '''
+        :returns: callbacks, in :class:`yajl_callbacks` order, that append
+            each event to ``batch`` rather than calling the content handler,
+            a key failing to decode stops the parse with its exception
+        '''
+        event = batch.events.append
+        value = batch.values.append
         def yajl_null(ctx):
-            return dispatch('yajl_null', ctx)
+            event(yajl_event_null); value(None)
+            return 1
         def yajl_boolean(ctx, boolVal):
-            return dispatch('yajl_boolean', ctx, boolVal)
+            event(yajl_event_boolean); value(boolVal)
+            return 1
         def yajl_integer(ctx, integerVal):
-            return dispatch('yajl_integer', ctx, integerVal)
+            event(yajl_event_integer); value(integerVal)
+            return 1
         def yajl_double(ctx, doubleVal):
-            return dispatch('yajl_double', ctx, doubleVal)
+            event(yajl_event_double); value(doubleVal)
+            return 1
         def yajl_number(ctx, stringVal, stringLen):
-            return dispatch('yajl_number', ctx, string_at(stringVal, stringLen))
+            value(string_at(stringVal, stringLen)); event(yajl_event_number)
+            return 1
         def yajl_string(ctx, stringVal, stringLen):
-            return dispatch('yajl_string', ctx, string_at(stringVal, stringLen))
+            value(string_at(stringVal, stringLen)); event(yajl_event_string)
+            return 1
         def yajl_start_map(ctx):
-            return dispatch('yajl_start_map', ctx)
+            event(yajl_event_start_map); value(None)
+            return 1
         def yajl_map_key(ctx, stringVal, stringLen):
-            return dispatch('yajl_map_key', ctx, string_at(stringVal, stringLen))
-        def yajl_end_map(ctx):
-            return dispatch('yajl_end_map', ctx)
-        def yajl_start_array(ctx):
-            return dispatch('yajl_start_array', ctx)
-        def yajl_end_array(ctx):
-            return dispatch('yajl_end_array', ctx)
-        def dispatch(func, *args, **kwargs):
+            # the key is decoded first to keep events and values in step
             try:
-                getattr(self.content_handler, func)(*args, **kwargs)
-                return 1
+                key = to_key(stringVal, stringLen)
             except Exception:
                 self._exc_info = sys.exc_info()
                 return 0
+            event(yajl_event_map_key); value(key)
+            return 1
+        def yajl_end_map(ctx):
+            event(yajl_event_end_map); value(None)
+            return 1
+        def yajl_start_array(ctx):
+            event(yajl_event_start_array); value(None)
+            return 1
+        def yajl_end_array(ctx):
+            event(yajl_event_end_array); value(None)
+            return 1
+        return [
+            yajl_null, yajl_boolean, yajl_integer, yajl_double,
+            yajl_number, yajl_string,
+            yajl_start_map, yajl_map_key, yajl_end_map,
+            yajl_start_array, yajl_end_array,
+        ]
 
-        if content_handler is None:
-            self.callbacks = None
+    def yajl_config(self, hand):
+        for k, v in self._config():
+            yajl.yajl_config(hand, k, v)
+
+    def _config(self):
+        '''
+        :returns: tuple of the ``(yajl_option, value)`` pairs set on self
+        '''
+        return tuple(
+            (k.value, getattr(self, v)) for k, v in _yajl_options
+            if hasattr(self, v)
+        )
+
+    def _alloc(self, ctx=None):
+        '''
+        :returns: ``(hand, key, reused)``, a configured yajl handle, reusing
+            the one kept by :meth:`_release` when ``ctx`` and the
+            configuration did not change, the key to release it with, and
+            whether it was reused
+        '''
+        key = (ctx, self._config())
+        hand, self._idle_hand = self._idle_hand, None
+        if hand is not None:
+            if self._idle_key[0] is ctx and self._idle_key[1] == key[1]:
+                return hand, key, True
+            yajl.yajl_free(hand)
+        return self._new_hand(key), key, False
+
+    def _new_hand(self, key):
+        '''
+        :returns: a new yajl handle for the ``key`` returned by :meth:`_alloc`
+        '''
+        hand = yajl.yajl_alloc(self.callbacks, None, key[0])
+        for k, v in key[1]:
+            yajl.yajl_config(hand, k, v)
+        return hand
+
+    def _release(self, hand, key, completed):
+        '''
+        Free ``hand``, or keep it for the next parse when the last parse
+        ``completed`` and the handle can take another document.
+
+        yajl has no way to reset a handle, but with allow_multiple_values
+        a handle is ready for a new value once a value is complete.
+        Partial values would leave it half way through a value.
+
+        A reused handle has already seen a value, so it accepts a stream
+        holding none. Such a stream is caught by looking for a byte that is
+        not whitespace, see :meth:`_complete`, which comments would defeat.
+        '''
+        config = dict(key[1])
+        if (completed and self._idle_hand is None
+                and config.get(yajl_allow_multiple_values.value)
+                and not config.get(yajl_allow_partial_values.value)
+                and not config.get(yajl_allow_comments.value)):
+            self._idle_hand, self._idle_key = hand, key
         else:
-            callbacks = [
-                yajl_null, yajl_boolean, yajl_integer, yajl_double,
-                yajl_number, yajl_string,
-                yajl_start_map, yajl_map_key, yajl_end_map,
-                yajl_start_array, yajl_end_array,
-            ]
-            # cannot have both number and integer|double
-            if hasattr(content_handler, 'yajl_number'):
-                # if yajl_number is available, it takes precedence
-                callbacks[2] = callbacks[3] = 0
-            else:
-                callbacks[4] = 0
-            # cast the funcs to C-types
-            callbacks = [
-                c_func(callback)
-                for c_func, callback in zip(c_funcs, callbacks)
-            ]
-            self.callbacks = byref(yajl_callbacks(*callbacks))
+            yajl.yajl_free(hand)
 
-        # set self's vars
-        self.buf_siz = buf_siz
-        self.content_handler = content_handler
+    def _drop_idle(self):
+        ''' Free the handle kept for reuse, if any '''
+        hand, self._idle_hand = self._idle_hand, None
+        if hand is not None:
+            yajl.yajl_free(hand)
 
-    def yajl_config(self, hand):
-        for k,v in [
-            (yajl_allow_comments, 'allow_comments'),
-            (yajl_dont_validate_strings, 'dont_validate_strings'),
-            (yajl_allow_comments, 'allow_comments'),
-            (yajl_dont_validate_strings, 'dont_validate_strings'),
-            (yajl_allow_trailing_garbage, 'allow_trailing_garbage'),
-            (yajl_allow_multiple_values, 'allow_multiple_values'),
-            (yajl_allow_partial_values, 'allow_partial_values'),
-        ]:
-            if hasattr(self, v):
-                yajl.yajl_config(hand, k, getattr(self, v))
-
-    def parse(self, f=sys.stdin, ctx=None):
+    def parse(self, f=sys.stdin, ctx=None, checkpoint=None,
+            checkpoint_interval=2**26, resume_from=None):
         '''Function to parse a JSON stream.
 
         :type f: file
-        :param f: stream to parse JSON from
+        :param f: stream to parse JSON from, or a bytes-like object (bytes,
+         bytearray, memoryview) holding the whole JSON text which is then
+         parsed with a single call to yajl
         :type ctx: ctypes.POINTER
         :param ctx: passed to all callback functions as the first param this is
          a feature of yajl, and not very useful in yajl-py since the context is
          preserved using the content_handler instance.
+        :param checkpoint: called with a :class:`YajlCheckpoint` when a top
+         level value completes, at most every ``checkpoint_interval``
+         bytes. Meant for multi-value streams (``allow_multiple_values``),
+         the checkpoint can be saved and given to ``resume_from`` to continue
+         the parse should it be interrupted.
+        :type checkpoint_interval: int
+        :param checkpoint_interval: minimum number of bytes between two
+         checkpoints
+        :type resume_from: :class:`YajlCheckpoint` or int
+        :param resume_from: checkpoint, or byte offset, to resume the parse
+         from. ``f`` is seeked (or sliced) to the offset, the state of the
+         checkpoint is passed to :meth:`YajlContentHandler.restore_state`
+         and the offsets of the following checkpoints are counted from the
+         start of ``f``.
         :raises YajlError: When invalid JSON in input stream found
+
+        Checkpoints cost a few python calls per top level value, and nothing
+        when ``checkpoint`` is not set.
+        '''
+        offset, state = 0, None
+        if isinstance(resume_from, YajlCheckpoint):
+            offset, state = resume_from
+        elif resume_from is not None:
+            offset = resume_from
+        if offset:
+            f = self._seek(f, offset)
+        if checkpoint is None:
+            return self._parse(self._read(f), ctx, state)
+        if self.batch is not None:
+            raise YajlConfigError('Checkpoints cannot be used with batch_events')
+        # [offset of the buffer, offset past the buffer, last checkpoint]
+        positions = [offset, offset, offset]
+        def buffers():
+            for fileData in self._read(f):
+                positions[0] = positions[1]
+                positions[1] += len(fileData)
+                yield fileData
+            positions[0] = positions[1]
+        callbacks = self.callbacks
+        self._drop_idle()
+        self.callbacks = self._checkpoint_callbacks(
+            checkpoint, checkpoint_interval, positions)
+        try:
+            self._parse(buffers(), ctx, state)
+        finally:
+            # the kept handle points to the checkpoint callbacks
+            self._drop_idle()
+            self.callbacks = callbacks
+
+    @staticmethod
+    def _seek(f, offset):
         '''
+        :returns: ``f`` positioned at ``offset``
+        '''
+        if isinstance(f, bytes):
+            return _bytes_at(f, min(offset, len(f)))
+        if isinstance(f, (bytearray, memoryview)):
+            return memoryview(f)[offset:]
+        if f is sys.stdin and hasattr(f, 'buffer'):
+            f = f.buffer
+        f.seek(offset)
+        return f
+
+    def _checkpoint_callbacks(self, checkpoint, interval, positions):
+        '''
+        :returns: the callbacks of the content handler, with the start and
+            end of maps and arrays wrapped to track the depth, and the ends
+            of maps and arrays and the scalars wrapped to call
+            ``checkpoint`` when a top level value completes, see
+            :meth:`parse`
+        '''
+        funcs = list(self._callback_funcs)
+        content_handler = self.content_handler
+        get_bytes_consumed = yajl.yajl_get_bytes_consumed
+        depth = [0]
+        def completed():
+            if positions[1] - positions[2] < interval:
+                return 1
+            # capped for yajl_complete_parse which parses an extra space
+            offset = min(
+                positions[0] + get_bytes_consumed(self._parse_hand),
+                positions[1])
+            if offset - positions[2] < interval:
+                return 1
+            positions[2] = offset
+            try:
+                state = None
+                if content_handler:
+                    state = content_handler.checkpoint_state()
+                checkpoint(YajlCheckpoint(offset, state))
+                return 1
+            except Exception:
+                self._exc_info = sys.exc_info()
+                return 0
+        def start(callback):
+            def wrapper(ctx):
+                depth[0] += 1
+                return callback(ctx) if callback else 1
+            return wrapper
+        def end(callback):
+            def wrapper(ctx):
+                if callback and not callback(ctx):
+                    return 0
+                depth[0] -= 1
+                return completed() if not depth[0] else 1
+            return wrapper
+        def scalar(callback):
+            def wrapper(ctx, *args):
+                if callback and not callback(ctx, *args):
+                    return 0
+                return completed() if not depth[0] else 1
+            return wrapper
+        # wrapping a NULL number callback would make yajl use it instead of
+        # the integer and double callbacks, see YajlContentHandler
+        if funcs[4] or not (funcs[2] or funcs[3]):
+            numbers = (4,)
+        else:
+            numbers = (2, 3)
+        for i in (0, 1, 5) + numbers:
+            funcs[i] = scalar(funcs[i])
+        for i in (6, 9):
+            funcs[i] = start(funcs[i])
+        for i in (8, 10):
+            funcs[i] = end(funcs[i])
+        return byref(yajl_callbacks(*[
+            c_func(callback or 0)
+            for (name, c_func), callback in zip(
+                yajl_callbacks._fields_, funcs)
+        ]))
+
+    def parse_file(self, path, mmap=True, ctx=None):
+        '''
+        Parse the JSON file at ``path``, same as :meth:`parse` otherwise.
+
+        :type mmap: bool
+        :param mmap: map the file in memory, one window of a few tens of MB
+            at a time, and pass ``buf_siz`` slices of the mapping straight
+            to yajl, rather than copying each buffer out of the file. The
+            file is read instead when it cannot be mapped.
+        :raises YajlError: When invalid JSON in input stream found
+        '''
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if not mmap or not size:
+                return self.parse(f, ctx)
+            self._parse(self._map_buffers(f, size), ctx)
+
+    def _map_buffers(self, f, size):
+        '''
+        :returns: generator of ``c_char`` arrays, each one a ``buf_siz``
+            slice of the file ``f`` of ``size`` bytes, mapped in memory one
+            window at a time, then read from ``f`` should mapping fail
+        '''
+        buf_siz = self.buf_siz
+        # a window holds at least a buffer past the aligned window offset
+        window = max(_map_window, buf_siz + ALLOCATIONGRANULARITY)
+        pos = 0
+        while pos < size:
+            start = pos - pos % ALLOCATIONGRANULARITY
+            length = min(window, size - start)
+            try:
+                # copy-on-write, pages are shared with the page cache but
+                # ctypes needs a writable buffer to point into it. Only the
+                # window counts against the commit limit.
+                m = _mmap(f.fileno(), length, access=ACCESS_COPY,
+                          offset=start)
+            except (OSError, EnvironmentError) as e:
+                if e.errno != errno.ENOMEM:
+                    raise
+                f.seek(pos)
+                for fileData in self._read(f):
+                    yield fileData
+                return
+            try:
+                while pos < size:
+                    n = min(buf_siz, size - pos)
+                    if pos + n > start + length:
+                        break
+                    yield (c_char * n).from_buffer(m, pos - start)
+                    pos += n
+            finally:
+                try:
+                    m.close()
+                except BufferError:
+                    # a buffer of the window is still referenced (by the
+                    # caller or a traceback), the window is unmapped along
+                    # with it
+                    pass
+
+    def _read(self, f):
+        '''
+        :returns: generator of the buffers read from ``f``, a bytes-like
+            object is passed to yajl whole, while streams supporting
+            ``readinto()`` are read into a single reusable buffer
+        '''
+        if isinstance(f, (bytes, Array)):
+            if len(f):
+                yield f
+            return
+        if isinstance(f, (bytearray, memoryview)):
+            if _nbytes(memoryview(f)):
+                yield self._buffer(f)
+            return
         if f is sys.stdin and hasattr(f, 'buffer'):
             # raw binary buffer available use instead
             # needed to read bytes in python3
             f = f.buffer
+        buf_siz = self.buf_siz
+        if hasattr(f, 'readinto'):
+            buf = bytearray(buf_siz)
+            full = (c_char * buf_siz).from_buffer(buf)
+            while 1:
+                n = f.readinto(buf)
+                if not n:
+                    break
+                yield full if n == buf_siz else (c_char * n).from_buffer(buf)
+            return
+        while 1:
+            fileData = f.read(buf_siz)
+            if not fileData:
+                break
+            yield fileData
+
+    @staticmethod
+    def _buffer(data):
+        '''
+        :returns: the bytes-like object ``data`` as a buffer yajl_parse
+            accepts: bytes as is, as well as a read-only view of all of
+            them, otherwise a ``c_char`` array over its memory, or a copy
+            when it is read-only or not contiguous
+        '''
+        if isinstance(data, bytes):
+            return data
+        view = memoryview(data)
+        nbytes = _nbytes(view)
+        obj = getattr(view, 'obj', None)
+        if (isinstance(obj, bytes) and view.c_contiguous
+                and len(obj) == nbytes):
+            return obj
+        try:
+            return (c_char * nbytes).from_buffer(view)
+        except (TypeError, ValueError):
+            return view.tobytes()
+
+    def _parse(self, buffers, ctx=None, state=None):
+        '''
+        Parse the JSON stream made of ``buffers`` calling the content
+        handler, see :meth:`parse`. A ``state`` to resume from is passed to
+        the content handler first.
+        '''
+        content_handler = self.content_handler
+        if content_handler:
+            content_handler.parse_start()
+            if state is not None:
+                content_handler.restore_state(state)
+        batch = self.batch
+        if content_handler:
+            yajl_events = self._hook('yajl_events')
+            parse_buf = self._hook('parse_buf')
+        buffers = self._parse_buffers(buffers, ctx)
+        try:
+            for fileData in buffers:
+                if batch and content_handler:
+                    yajl_events(ctx, batch)
+                if content_handler:
+                    parse_buf()
+        finally:
+            buffers.close()
+        if content_handler:
+            content_handler.complete_parse()
+
+    def events(self, f=sys.stdin, ctx=None):
+        '''
+        Pull parser, an alternative to :meth:`parse` that does not call the
+        content handler.
+
+        :type f: file
+        :param f: stream to parse JSON from
+        :returns: generator of ``(event, value)`` tuples, as found in
+            :class:`YajlEventBatch`, read from ``f`` one buffer at a time.
+            Stopping the iteration early stops the parse.
+        :raises YajlError: When invalid JSON in input stream found
+        :raises YajlConfigError: When the parser was not created with
+            ``batch_events=True``
+        '''
+        if self.batch is None:
+            raise YajlConfigError('Pulling events requires batch_events=True')
+        batch = self.batch
+        for fileData in self._parse_buffers(self._read(f), ctx):
+            for event in batch:
+                yield event
+
+    def feed(self, data):
+        '''
+        Parse ``data``, the next part of a JSON stream, for when the caller
+        owns the read loop. Callbacks are called as they would be by
+        :meth:`parse`, call :meth:`close` once the stream is exhausted.
+
+        :type data: bytes-like object (bytes, bytearray, memoryview)
+        :returns: with ``batch_events=True``, the :class:`YajlEventBatch` of
+            the events parsed from ``data``, valid until the next call to
+            :meth:`feed` or :meth:`close`, otherwise None
+        :raises YajlError: When invalid JSON is found, the parse is then
+            abandoned and the next call to :meth:`feed` starts a new stream
+        '''
+        if self._hand is None:
+            if self.content_handler:
+                self.content_handler.parse_start()
+            self._hand, self._hand_key, self._blank = self._alloc()
+        if not data:
+            if self.batch is not None:
+                self.batch.clear()
+            return self.batch
+        return self._feed(self._buffer(data))
+
+    def close(self):
+        '''
+        Complete the parse of the stream given to :meth:`feed`.
+
+        :returns: same as :meth:`feed`, for the events held back by yajl
+            until the end of the stream (e.g. a top level number)
+        :raises YajlError: When the stream is not a complete JSON text
+        '''
+        if self._hand is None:
+            return None
+        batch = self._feed(b'')
+        hand, self._hand = self._hand, None
+        self._release(hand, self._hand_key, True)
         if self.content_handler:
-            self.content_handler.parse_start()
-        hand = yajl.yajl_alloc(self.callbacks, None, ctx)
-        self.yajl_config(hand)
+            self.content_handler.complete_parse()
+        return batch
+
+    def _feed(self, data):
+        '''
+        Parse ``data`` using the handle allocated by :meth:`feed`, an empty
+        ``data`` completes the parse.
+        '''
+        hand = self._hand
+        batch = self.batch
+        if batch is not None:
+            batch.clear()
+        if self.string_mode == 'view':
+            self._set_chunk(data)
+        yajl_parse, yajl_complete_parse = self._yajl_parse_funcs()
+        if data:
+            if self._blank:
+                self._blank = _non_blank(data) is None
+            stat = yajl_parse(hand, data, len(data))
+        else:
+            if self._blank:
+                hand = self._hand = self._complete(hand, self._hand_key)
+            stat = yajl_complete_parse(hand)
+        try:
+            if batch and self.content_handler:
+                self._hook('yajl_events')(None, batch)
+            if self.content_handler:
+                self._hook('parse_buf')()
+            self._check_status(hand, stat, data)
+        except Exception:
+            self._hand = None
+            self._release(hand, self._hand_key, False)
+            raise
+        return batch
+
+    def __del__(self):
+        hand = getattr(self, '_hand', None)
+        if hand is not None:
+            self._hand = None
+            yajl.yajl_free(hand)
+        if getattr(self, '_idle_hand', None) is not None:
+            self._drop_idle()
+
+    def _yajl_parse_funcs(self):
+        '''
+        :returns: ``yajl_parse`` and ``yajl_complete_parse``, wrapped to
+            collect :attr:`stats` when enabled
+        '''
+        if self.stats is None:
+            return yajl.yajl_parse, yajl.yajl_complete_parse
+        return (
+            self.stats.yajl_parse(yajl.yajl_parse),
+            self.stats.yajl_call(yajl.yajl_complete_parse),
+        )
+
+    def _parse_buffers(self, buffers, ctx=None):
+        '''
+        Generator passing each of ``buffers`` to yajl. It yields each
+        buffer once yajl has parsed it, before reporting any error found in
+        it, so that the events of the buffer (see :attr:`batch`) can be
+        handled. The last buffer yielded is empty, it completes the parse.
+
+        :raises YajlError: When invalid JSON in input stream found
+        '''
+        hand, key, blank = self._alloc(ctx)
+        self._parse_hand = hand
+        completed = False
+        batch = self.batch
+        if batch is not None:
+            batch.clear()
+        view = self.string_mode == 'view'
+        yajl_parse, yajl_complete_parse = self._yajl_parse_funcs()
+        buffers = iter(buffers)
         try:
             while 1:
-                fileData = f.read(self.buf_siz)
+                fileData = next(buffers, b'')
+                if view:
+                    self._set_chunk(fileData)
                 if not fileData:
-                    stat = yajl.yajl_complete_parse(hand)
+                    if blank:
+                        hand = self._parse_hand = self._complete(hand, key)
+                    stat = yajl_complete_parse(hand)
                 else:
-                    stat = yajl.yajl_parse(hand, fileData, len(fileData))
-                if self.content_handler:
-                    self.content_handler.parse_buf()
-                if  stat != yajl_status_ok.value:
-                    if stat == yajl_status_client_canceled.value:
-                        # it means we have an exception
-                        if self._exc_info:
-                            exc_info = self._exc_info
-                            six.reraise(exc_info[0], exc_info[1], exc_info[2])
-                        else: # for some reason we have no error stored
-                            raise YajlParseCancelled()
-                    else:
-                        yajl.yajl_get_error.restype = c_char_p
-                        error = yajl.yajl_get_error(
-                            hand, 1, fileData, len(fileData))
-                        # in python3 error is bytes so must be encoded
-                        # to something printable
-                        error = error.decode('latin-1')
-                        raise YajlError(error)
+                    if blank:
+                        blank = _non_blank(fileData) is None
+                    stat = yajl_parse(hand, fileData, len(fileData))
+                yield fileData
+                if batch is not None:
+                    batch.clear()
+                self._check_status(hand, stat, fileData)
                 if not fileData:
-                    if self.content_handler:
-                        self.content_handler.complete_parse()
+                    completed = True
                     break
         finally:
-            yajl.yajl_free(hand)
+            if batch is not None:
+                batch.clear()
+            if view:
+                self._set_chunk(b'')
+            self._parse_hand = None
+            self._release(hand, key, completed)
+
+    def _complete(self, hand, key):
+        '''
+        Replace ``hand``, a reused handle that was only given whitespace, by
+        a new handle for the parse to be completed with. A reused handle
+        would accept the stream, the new one fails as a first parse does.
+
+        :returns: the new handle
+        '''
+        yajl.yajl_free(hand)
+        return self._new_hand(key)
+
+    def _check_status(self, hand, stat, fileData):
+        '''
+        :raises: the exception raised by a callback, or :class:`YajlError`
+            when ``stat``, returned by yajl for ``fileData``, is not ok
+        '''
+        if  stat != yajl_status_ok.value:
+            if stat == yajl_status_client_canceled.value:
+                # it means we have an exception
+                if self._exc_info:
+                    exc_info, self._exc_info = self._exc_info, None
+                    six.reraise(exc_info[0], exc_info[1], exc_info[2])
+                else: # for some reason we have no error stored
+                    raise YajlParseCancelled()
+            else:
+                yajl.yajl_get_error.restype = c_char_p
+                error = yajl.yajl_get_error(
+                    hand, 1, fileData, len(fileData))
+                # in python3 error is bytes so must be encoded
+                # to something printable
+                error = error.decode('latin-1')
+                raise YajlError(error)
+
+def _tree_callbacks(parser, values, encoding, key_cache=0):
+    '''
+    :returns: a :class:`yajl_callbacks` reference whose callbacks build
+        python objects directly, appending each top level value to
+        ``values``. Exceptions are stored on ``parser`` to be re-raised
+        by :meth:`YajlParser.parse`.
+    '''
+    stack = []  # containers currently being built
+    keys = []   # pending key of each map in the stack
+    def add(value):
+        if not stack:
+            values.append(value)
+        elif stack[-1].__class__ is list:
+            stack[-1].append(value)
+        else:
+            stack[-1][keys[-1]] = value
+    if encoding:
+        def to_str(stringVal, stringLen):
+            return string_at(stringVal, stringLen).decode(encoding)
+    else:
+        to_str = string_at
+    to_key = _key_cache(key_cache, encoding) if key_cache else to_str
+    def yajl_null(ctx):
+        add(None)
+        return 1
+    def yajl_boolean(ctx, boolVal):
+        add(bool(boolVal))
+        return 1
+    def yajl_integer(ctx, integerVal):
+        add(integerVal)
+        return 1
+    def yajl_double(ctx, doubleVal):
+        add(doubleVal)
+        return 1
+    def yajl_string(ctx, stringVal, stringLen):
+        try:
+            add(to_str(stringVal, stringLen))
+            return 1
+        except Exception:
+            parser._exc_info = sys.exc_info()
+            return 0
+    def yajl_start_map(ctx):
+        d = {}
+        add(d)
+        stack.append(d)
+        keys.append(None)
+        return 1
+    def yajl_map_key(ctx, stringVal, stringLen):
+        try:
+            keys[-1] = to_key(stringVal, stringLen)
+            return 1
+        except Exception:
+            parser._exc_info = sys.exc_info()
+            return 0
+    def yajl_end_map(ctx):
+        stack.pop()
+        keys.pop()
+        return 1
+    def yajl_start_array(ctx):
+        l = []
+        add(l)
+        stack.append(l)
+        return 1
+    def yajl_end_array(ctx):
+        stack.pop()
+        return 1
+    return byref(yajl_callbacks(
+        YAJL_NULL(yajl_null), YAJL_BOOL(yajl_boolean),
+        YAJL_INT(yajl_integer), YAJL_DBL(yajl_double), YAJL_NUM(0),
+        YAJL_STR(yajl_string), YAJL_SDCT(yajl_start_map),
+        YAJL_DCTK(yajl_map_key), YAJL_EDCT(yajl_end_map),
+        YAJL_SARR(yajl_start_array), YAJL_EARR(yajl_end_array),
+    ))
+
+def load(f, encoding='utf-8', buf_siz=65536, key_cache=1024, **kwargs):
+    '''
+    Parse a JSON stream into python objects (dicts, lists, strings, ints,
+    floats, bools and None).
+
+    :type f: file
+    :param f: stream to parse JSON from, see :meth:`YajlParser.parse`
+    :type encoding: string
+    :param encoding: used to decode strings and map keys, if ``None`` they
+        are returned as bytes.
+    :type buf_siz: int
+    :param buf_siz: see :class:`YajlParser`
+    :type key_cache: int
+    :param key_cache: number of decoded map keys to reuse for repeated
+        keys, see :class:`YajlParser`
+    :param kwargs: parser configuration, see :class:`YajlParser`, e.g.
+        ``allow_comments=True``
+    :returns: the parsed value, or a list of all the parsed values when
+        ``allow_multiple_values=True``
+    :raises YajlError: When invalid JSON in input stream found, or no
+        value at all
+    :raises YajlConfigError: When a keyword argument is not a yajl option
+
+    The objects are built directly by the yajl callbacks, without going
+    through a :class:`YajlContentHandler`. Numbers that cannot be
+    represented in a double or a long long int raise a :class:`YajlError`.
+    '''
+    parser = YajlParser(buf_siz=buf_siz)
+    _configure(parser, kwargs)
+    values = []
+    parser.callbacks = _tree_callbacks(parser, values, encoding, key_cache)
+    parser.parse(f)
+    if kwargs.get('allow_multiple_values'):
+        return values
+    if not values:
+        # allow_partial_values accepts a stream without any value
+        raise YajlError('No JSON value found in input stream')
+    return values[0]
+
+def loads(s, encoding='utf-8', **kwargs):
+    '''
+    :type s: bytes
+    :param s: JSON document, text is encoded using ``encoding`` first
+
+    Same as :func:`load` but parses ``s`` with a single call to yajl.
+    '''
+    if isinstance(s, six.text_type):
+        s = s.encode(encoding or 'utf-8')
+    return load(s, encoding, **kwargs)
@@ -0,0 +1,125 @@
+'''
+Reformat (beautify or minify) JSON by connecting the yajl parser callbacks
+straight to the yajl_gen functions of a single generator.
+
+The C signatures of the parser callbacks and of the generator functions
+match, but yajl_gen returns 0 when the parser expects non zero to carry on,
+so each token still goes through a ctypes callback. That callback passes
+the pointers reported by yajl as is to yajl_gen: strings, keys and numbers
+are never copied into python objects, and numbers keep their exact text.
+'''
+
+import sys
+from ctypes import byref, c_void_p, c_size_t
+from .yajl_common import yajl
+from .yajl_parse import (
+    YajlParser, _configure, yajl_callbacks, YAJL_NULL, YAJL_BOOL, YAJL_INT,
+    YAJL_DBL, YAJL_NUM, YAJL_STR, YAJL_SDCT, YAJL_DCTK, YAJL_EDCT, YAJL_SARR,
+    YAJL_EARR,
+)
+from .yajl_gen import YajlGen, YajlGenException, yajl_gen_status
+
+# own prototypes taking the pointers reported by the parser callbacks
+_yajl_gen_string = yajl['yajl_gen_string']
+_yajl_gen_string.argtypes = [c_void_p, c_void_p, c_size_t]
+_yajl_gen_number = yajl['yajl_gen_number']
+_yajl_gen_number.argtypes = [c_void_p, c_void_p, c_size_t]
+
+yajl_gen_generation_complete = 4
+
+def _reformat_callbacks(parser, g, stream):
+    '''
+    :returns: a :class:`yajl_callbacks` reference generating each event
+        with the handle of the :class:`YajlGen` ``g``. Generator errors are
+        stored on ``parser`` to be raised when the parse is cancelled.
+    '''
+    hand = g.g
+    reset = yajl.yajl_gen_reset
+    def failed(status, func, *args):
+        if status == yajl_gen_generation_complete and stream:
+            # next value of a stream
+            reset(hand, b'\n')
+            status = func(hand, *args)
+            if not status:
+                return 1
+        try:
+            raise YajlGenException(yajl_gen_status[status])
+        except YajlGenException:
+            parser._exc_info = sys.exc_info()
+        return 0
+    def event(func):
+        def callback(ctx):
+            status = func(hand)
+            return not status or failed(status, func)
+        return callback
+    def value(func):
+        def callback(ctx, value):
+            status = func(hand, value)
+            return not status or failed(status, func, value)
+        return callback
+    def string(func):
+        def callback(ctx, stringVal, stringLen):
+            status = func(hand, stringVal, stringLen)
+            return not status or failed(status, func, stringVal, stringLen)
+        return callback
+    return byref(yajl_callbacks(
+        YAJL_NULL(event(yajl.yajl_gen_null)),
+        YAJL_BOOL(value(yajl.yajl_gen_bool)),
+        # numbers are passed through as text by yajl_number
+        YAJL_INT(0), YAJL_DBL(0),
+        YAJL_NUM(string(_yajl_gen_number)),
+        YAJL_STR(string(_yajl_gen_string)),
+        YAJL_SDCT(event(yajl.yajl_gen_map_open)),
+        YAJL_DCTK(string(_yajl_gen_string)),
+        YAJL_EDCT(event(yajl.yajl_gen_map_close)),
+        YAJL_SARR(event(yajl.yajl_gen_array_open)),
+        YAJL_EARR(event(yajl.yajl_gen_array_close)),
+    ))
+
+def reformat(src, dst=None, beautify=False, indent=b'    ', stream=False,
+        escape_solidus=False, buf_siz=65536, **kwargs):
+    '''
+    Reformat the JSON read from ``src`` into ``dst``.
+
+    :param src: stream to parse JSON from, see :meth:`YajlParser.parse`
+    :type dst: file
+    :param dst: binary stream the reformatted JSON is written to after each
+        buffer parsed, if None the reformatted JSON is returned
+    :type beautify: bool
+    :param beautify: pretty print, minify otherwise
+    :type indent: bytes
+    :param indent: indentation string, only used with ``beautify=True``
+    :type stream: bool
+    :param stream: reformat a stream of multiple JSON values, separated by
+        newlines in the output
+    :type escape_solidus: bool
+    :param escape_solidus: escape forward slashes (for embedding in HTML)
+    :type buf_siz: int
+    :param buf_siz: see :class:`YajlParser`
+    :param kwargs: parser configuration, see :class:`YajlParser`, e.g.
+        ``allow_comments=True``
+    :returns: the reformatted JSON when ``dst`` is None
+    :raises YajlError: When invalid JSON in input stream found
+    :raises YajlConfigError: When a keyword argument is not a yajl option
+    :raises YajlGenException: When yajl cannot generate a value
+    '''
+    config = {'beautify': beautify}
+    if beautify:
+        config['indent'] = indent
+    if escape_solidus:
+        config['gen_escape_solidus'] = True
+    g = YajlGen(**config)
+    parser = YajlParser(buf_siz=buf_siz)
+    parser.allow_multiple_values = stream
+    _configure(parser, kwargs)
+    parser.callbacks = _reformat_callbacks(parser, g, stream)
+    chunks = []
+    write = chunks.append if dst is None else dst.write
+    buffers = parser._parse_buffers(parser._read(src))
+    try:
+        for fileData in buffers:
+            write(g.yajl_gen_get_buf())
+    finally:
+        buffers.close()
+    if dst is None:
+        return b''.join(chunks)
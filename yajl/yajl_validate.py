@@ -0,0 +1,110 @@
+'''
+Validate many JSON documents in parallel.
+
+Calls into libyajl release the GIL, and validating needs no callbacks, so
+documents validated on separate threads are parsed on separate cores.
+'''
+
+from collections import namedtuple
+from ctypes import c_void_p, c_char_p, c_int, c_size_t, string_at
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+from .yajl_common import yajl
+from .yajl_parse import (
+    YajlParser, _check_options, _configure, yajl_status_ok,
+)
+
+# own prototypes, yajl.yajl_get_error returns bytes and the error message
+# could then not be freed
+_yajl_get_error = yajl['yajl_get_error']
+_yajl_get_error.restype = c_void_p
+_yajl_get_error.argtypes = [c_void_p, c_int, c_char_p, c_size_t]
+_yajl_free_error = yajl['yajl_free_error']
+_yajl_free_error.restype = None
+_yajl_free_error.argtypes = [c_void_p, c_void_p]
+
+class YajlValidation(
+        namedtuple('YajlValidation', 'source valid offset error')):
+    '''
+    Result of validating ``source``, ``valid`` is a bool. For invalid
+    documents ``offset`` is the byte offset at which the error was found and
+    ``error`` is yajl's error message, otherwise both are None.
+    '''
+    __slots__ = ()
+
+def _buffers(source, buf_siz):
+    '''
+    :returns: generator of the buffers to validate from ``source``
+    '''
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield bytes(source)
+    elif hasattr(source, 'read'):
+        while 1:
+            data = source.read(buf_siz)
+            if not data:
+                break
+            yield data
+    else:
+        with open(source, 'rb') as f:
+            for data in _buffers(f, buf_siz):
+                yield data
+
+def validate(source, buf_siz=65536, **kwargs):
+    '''
+    :param source: path of a file, file object, or bytes-like object
+        holding a JSON document
+    :type buf_siz: int
+    :param buf_siz: see :class:`YajlParser`
+    :param kwargs: parser configuration, see :class:`YajlParser`, e.g.
+        ``allow_comments=True``
+    :rtype: :class:`YajlValidation`
+    '''
+    parser = YajlParser(buf_siz=buf_siz)
+    _configure(parser, kwargs)
+    hand = yajl.yajl_alloc(None, None, None)
+    try:
+        parser.yajl_config(hand)
+        offset = 0
+        data = b''
+        for data in _buffers(source, buf_siz):
+            stat = yajl.yajl_parse(hand, data, len(data))
+            if stat != yajl_status_ok.value:
+                offset += yajl.yajl_get_bytes_consumed(hand)
+                break
+            offset += len(data)
+        else:
+            data = b''
+            stat = yajl.yajl_complete_parse(hand)
+        if stat == yajl_status_ok.value:
+            return YajlValidation(source, True, None, None)
+        error = _yajl_get_error(hand, 0, data, len(data))
+        try:
+            message = string_at(error).decode('latin-1').strip()
+        finally:
+            _yajl_free_error(hand, error)
+        return YajlValidation(source, False, offset, message)
+    finally:
+        yajl.yajl_free(hand)
+
+def validate_many(sources, workers=None, buf_siz=65536, **kwargs):
+    '''
+    Validate ``sources`` on a pool of ``workers`` threads, one per cpu by
+    default. The other parameters are the same as for :func:`validate`.
+
+    :returns: list of :class:`YajlValidation`, in the order of ``sources``.
+        A source that cannot be read (e.g. a missing file) is reported as
+        invalid, with no offset and the message of the error as ``error``.
+    :raises YajlConfigError: When a keyword argument is not a yajl option
+    '''
+    _check_options(kwargs)
+    def validate_source(source):
+        try:
+            return validate(source, buf_siz, **kwargs)
+        except (IOError, OSError) as e:
+            return YajlValidation(source, False, None, str(e))
+    pool = ThreadPool(workers or cpu_count())
+    try:
+        return pool.map(validate_source, sources, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()